@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+'''
+# asynchronous, batched logging
+ - the polling loop only puts LogRecords on a queue (QueueHandler), message formatting happens on the writer thread
+ - writer thread buffers records and writes them in batches (batch size / flush interval)
+ - size and time based rotation, structured json-lines records
+ - sampling for repetitive records (extra={'sample_key': ...}), e.g. "no stock" search cycles
+'''
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+_STOP = object()
+
+
+class json_formatter(logging.Formatter):
+    def format(self, record):
+        entry = {"time": datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+                 "level": record.levelname,
+                 "message": record.getMessage()}
+        if getattr(record, 'sample_rate', None):
+            entry["sample_rate"] = record.sample_rate
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class sampling_filter(logging.Filter):
+    """ sample_key 가 있는 기록은 같은 key 의 every 개 중 하나만 남깁니다. """
+
+    def __init__(self, every=100):
+        super().__init__()
+        self.every = max(1, int(every))
+        self._counts = {}
+
+    def filter(self, record):
+        key = getattr(record, 'sample_key', None)
+        if key is None:
+            return True
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        if count % self.every:
+            return False
+        record.sample_rate = self.every
+        return True
+
+
+class deferred_queue_handler(logging.handlers.QueueHandler):
+    # 기본 QueueHandler 는 큐에 넣기 전에 메시지를 포맷합니다. 포맷은 기록 스레드에서 하도록 그대로 넘깁니다.
+    def prepare(self, record):
+        return record
+
+
+class batched_log_writer(threading.Thread):
+    def __init__(self, log_queue, filename, formatter, max_bytes=5 * 1024 * 1024, backup_count=3,
+                 rotate_interval=86400, flush_interval=1.0, batch_size=256):
+        super().__init__(name='log-writer', daemon=True)
+        self._queue = log_queue
+        self.filename = filename
+        self._formatter = formatter
+        self.max_bytes = max_bytes  # 이 크기를 넘으면 파일을 교체합니다. 단위: byte (0 이면 사용하지 않음)
+        self.backup_count = backup_count
+        self.rotate_interval = rotate_interval  # 이 시간이 지나면 파일을 교체합니다. 단위: 초 (0 이면 사용하지 않음)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._file = None
+        self._size = 0
+        self._opened_at = 0.0
+
+    def run(self):
+        buffer = []
+        last_flush = time.monotonic()
+        while True:
+            try:
+                record = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                record = None
+
+            if record is _STOP:
+                self._write(buffer)
+                break
+            if record is not None:
+                try:
+                    buffer.append(self._formatter.format(record))
+                except Exception:
+                    pass
+
+            if buffer and (len(buffer) >= self.batch_size or time.monotonic() - last_flush >= self.flush_interval):
+                self._write(buffer)
+                buffer = []
+                last_flush = time.monotonic()
+        self._close()
+
+    def stop(self):
+        self._queue.put(_STOP)
+        self.join()
+
+    def _write(self, lines):
+        if not lines:
+            return
+        data = '\n'.join(lines) + '\n'
+        try:
+            if self._file is None:
+                self._open()
+            if self._size and self._should_rotate(len(data)):
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+            self._size += len(data.encode('utf-8'))
+        except OSError:
+            pass
+
+    def _open(self):
+        self._file = open(self.filename, 'a', encoding='utf-8')
+        self._size = self._file.tell()
+        self._opened_at = time.time()
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _should_rotate(self, incoming):
+        if self.max_bytes and self._size + incoming > self.max_bytes:
+            return True
+        return bool(self.rotate_interval) and time.time() - self._opened_at >= self.rotate_interval
+
+    def _rotate(self):
+        self._close()
+        if self.backup_count > 0:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = "%s.%d" % (self.filename, index)
+                if os.path.exists(source):
+                    os.replace(source, "%s.%d" % (self.filename, index + 1))
+            if os.path.exists(self.filename):
+                os.replace(self.filename, self.filename + ".1")
+        else:
+            open(self.filename, 'w').close()
+        self._open()
+
+
+def start_logging(filename='vaccine-run-kakao.log', level=logging.INFO, sample_every=100, **writer_options):
+    """ root logger 를 큐 기반 비동기 기록으로 설정하고, 기록 스레드(stop() 으로 종료)를 반환합니다. """
+    log_queue = queue.SimpleQueue()
+    handler = deferred_queue_handler(log_queue)
+    handler.addFilter(sampling_filter(sample_every))
+
+    root = logging.getLogger()
+    for previous in list(root.handlers):
+        root.removeHandler(previous)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    writer = batched_log_writer(log_queue, filename, json_formatter(), **writer_options)
+    writer.start()
+    return writer
@@ -0,0 +1,152 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+# end-to-end latency benchmark : stock appears -> reservation POST received
+ - mock_kakao_server runs on its own event loop thread, vaccine_reservation on the main thread
+ - every trial injects stock at a random time and waits for find_vaccine to book it
+ - reports p50/p95/p99 of detection latency, reservation round trip and client cpu per search cycle
+
+# usage
+ python benchmarks/bench_latency.py --trials 50 --hospitals 300 --output bench_latency.json
+ python benchmarks/bench_latency.py --json-decoder json   # compare against the stdlib decoder
+'''
+
+import argparse
+import asyncio
+import random
+import threading
+import time
+
+from common import AREA, load_vaccine_module, offline_config, offline_user, quiet, summary, write_result
+
+import json_decoder
+from mock_kakao_server import mock_kakao_server, mock_scenario
+
+
+class server_thread:
+    """ 클라이언트 CPU 측정에 섞이지 않도록 모의 서버를 별도 스레드의 이벤트 루프에서 실행합니다. """
+
+    def __init__(self, scenario):
+        self.server = mock_kakao_server(scenario)
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result()
+        return self.server
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+    def set_stock(self, org_code, left_counts):
+        self.loop.call_soon_threadsafe(self.server.set_stock, org_code, left_counts)
+
+
+def make_timed_client(vaccine):
+    class timed_http_client(vaccine.kakao_http_client):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.reservation_rtt = []
+
+        async def post_json(self, url, data, headers, **kwargs):
+            if not url.endswith('/api/v1/reservation'):
+                return await super().post_json(url, data, headers, **kwargs)
+            start = time.perf_counter()
+            try:
+                return await super().post_json(url, data, headers, **kwargs)
+            finally:
+                self.reservation_rtt.append(time.perf_counter() - start)
+
+    return timed_http_client
+
+
+async def run_trials(vaccine, runner, args):
+    server = runner.server
+    rng = random.Random(args.seed)
+    codes = server.hospital_codes()
+    result = {"detection_latency": [], "cpu_per_cycle": [], "missed": 0}
+
+    async with make_timed_client(vaccine)() as http_client:
+        for _ in range(args.trials):
+            org_code = rng.choice(codes)
+            stock_at = rng.uniform(args.min_delay, args.max_delay)
+
+            with quiet():
+                config = offline_config(vaccine, {"search_interval": args.interval})
+                reservation = vaccine.vaccine_reservation(offline_user(), http_client, config)
+
+            reservation_count = len(server.reservation_log)
+            search_count = server.search_count
+            cpu_start = time.thread_time()
+            loop = asyncio.get_running_loop()
+            loop.call_later(stock_at, runner.set_stock, org_code, 1)
+            try:
+                with quiet():
+                    await asyncio.wait_for(reservation.find_vaccine(), stock_at + args.trial_timeout)
+            except asyncio.TimeoutError:
+                result["missed"] += 1
+                runner.set_stock(org_code, 0)
+                continue
+            cpu_used = time.thread_time() - cpu_start
+            cycles = max(server.search_count - search_count, 1)
+            result["cpu_per_cycle"].append(cpu_used / cycles)
+
+            stock_time = next(at for at, code, count in reversed(server.stock_log) if code == org_code and count)
+            sent_time = next(at for at, code, _ in server.reservation_log[reservation_count:] if code == org_code)
+            result["detection_latency"].append(sent_time - stock_time)
+
+        result["reservation_rtt"] = http_client.reservation_rtt
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="stock-appears-to-reservation-sent latency benchmark")
+    parser.add_argument("--trials", type=int, default=30)
+    parser.add_argument("--hospitals", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.1, help="search_interval (seconds)")
+    parser.add_argument("--latency", type=float, default=0.02, help="mock server latency (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.01, help="mock server jitter (seconds)")
+    parser.add_argument("--min-delay", type=float, default=0.2, help="earliest stock injection (seconds)")
+    parser.add_argument("--max-delay", type=float, default=1.0, help="latest stock injection (seconds)")
+    parser.add_argument("--trial-timeout", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json-decoder", help="json, orjson or ujson (default: fastest installed)")
+    parser.add_argument("--output", help="write json result to this file")
+    args = parser.parse_args()
+    if args.json_decoder:
+        try:
+            json_decoder.set_decoder(args.json_decoder)
+        except ValueError as error:
+            parser.error(str(error))
+
+    vaccine = load_vaccine_module()
+
+    behavior = {"latency": args.latency, "jitter": args.jitter}
+    scenario = mock_scenario.from_dict({"random_hospitals": args.hospitals, "area": AREA, "seed": args.seed,
+                                        "search": behavior, "reservation": behavior})
+    runner = server_thread(scenario)
+    server = runner.start()
+    vaccine.Endpoints.set_base_url(server.base_url, server.base_url)
+    try:
+        raw = asyncio.run(run_trials(vaccine, runner, args))
+    finally:
+        runner.stop()
+
+    write_result({
+        "benchmark": "latency",
+        "config": vars(args),
+        "json_decoder": json_decoder.decoder_name(),
+        "trials": args.trials,
+        "missed": raw["missed"],
+        "detection_latency_ms": summary(raw["detection_latency"], 1000),
+        "reservation_rtt_ms": summary(raw["reservation_rtt"], 1000),
+        "cpu_per_cycle_ms": summary(raw["cpu_per_cycle"], 1000),
+    }, args.output)
+
+
+# ===================================== run ===================================== #
+if __name__ == '__main__':
+    main()
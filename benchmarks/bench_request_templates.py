@@ -0,0 +1,147 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+# request template micro-benchmark
+ - per-request cpu time and memory of building the search / reservation request, before and after request_templates
+ - before : dict -> json.dumps -> utf-8 encode (aiohttp StringPayload), cookies= dict merged by aiohttp through a
+   temporary cookie jar for every request
+ - after : pre-encoded bytes, orgCode substituted into the reservation template, Cookie header built once
+
+# usage
+ python benchmarks/bench_request_templates.py --iterations 100000 --output bench_request_templates.json
+'''
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import tracemalloc
+from http.cookies import SimpleCookie
+
+import aiohttp
+from yarl import URL
+
+from common import AREA, VACCINE_TYPE, load_vaccine_module, write_result
+
+from geo_tiling import tile_planner
+from request_templates import request_templates
+
+RESERVATION_URL = URL('https://vaccine.kakao.com/api/v1/reservation')
+ORG_CODE = "41360123"
+
+# 로그인된 .kakao.com 쿠키와 비슷한 개수, 길이
+COOKIES = {"cookie_%d" % index: "v%d" % index + "x" * 96 for index in range(10)}
+
+# aiohttp 가 cookies= 를 받으면 요청마다 만드는 임시 쿠키 저장소 (aiohttp 3.9 이전은 CookieJar)
+_request_cookie_jar = getattr(aiohttp.client, '_UnlimitedCookieJar', aiohttp.CookieJar)
+
+
+def legacy_search(tile, headers):
+    return json.dumps(tile.body()).encode('utf-8'), headers
+
+
+def template_search(templates, tile):
+    return templates.search_body(tile), templates.search_headers
+
+
+def legacy_reservation(org_code, headers, cookies):
+    data = {"from": "Map", "vaccineCode": VACCINE_TYPE, "orgCode": org_code, "distance": "null"}
+    body = json.dumps(data).encode('utf-8')
+    # ClientSession._request / ClientRequest.update_cookies 와 같은 과정
+    cookie_jar = _request_cookie_jar()
+    cookie_jar.update_cookies(cookies)
+    request_cookies = SimpleCookie()
+    request_cookies.load(cookie_jar.filter_cookies(RESERVATION_URL))
+    request_headers = dict(headers)
+    request_headers["Cookie"] = request_cookies.output(header='', sep=';').strip()
+    return body, request_headers
+
+
+def template_reservation(templates, org_code, cookies):
+    return templates.reservation_body(org_code), templates.reservation_headers(cookies)
+
+
+def cpu_ns_per_call(function, iterations, repeat):
+    results = []
+    for _ in range(repeat):
+        start = time.process_time_ns()
+        for _ in range(iterations):
+            function()
+        results.append((time.process_time_ns() - start) / iterations)
+    return statistics.median(results)
+
+
+def memory_per_call(function, samples=200):
+    """ 한 번 호출하는 동안의 최대 임시 메모리와 결과가 계속 잡고 있는 메모리. 단위: byte """
+    function()
+    peaks = []
+    retained = []
+    tracemalloc.start()
+    try:
+        for _ in range(samples):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            result = function()
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - baseline)
+            retained.append(current - baseline)
+            del result
+    finally:
+        tracemalloc.stop()
+    return statistics.median(peaks), statistics.median(retained)
+
+
+def measure(name, function, iterations, repeat):
+    peak, retained = memory_per_call(function)
+    return {"case": name, "cpu_ns_per_call": round(cpu_ns_per_call(function, iterations, repeat), 1),
+            "peak_bytes_per_call": peak, "retained_bytes_per_call": retained}
+
+
+async def run(args):
+    # aiohttp 쿠키 저장소는 실행중인 이벤트 루프가 필요합니다.
+    vaccine = load_vaccine_module()
+    planner = tile_planner(AREA[0], AREA[3], AREA[2], AREA[1], rows=3, cols=3)
+    tile = planner.tiles[4]
+    templates = request_templates(VACCINE_TYPE, vaccine.Headers.headers_map, vaccine.Headers.headers_vacc,
+                                  planner.tiles)
+
+    # 같은 요청을 만드는지 먼저 확인합니다.
+    assert json.loads(legacy_reservation(ORG_CODE, vaccine.Headers.headers_vacc, COOKIES)[0]) == \
+        json.loads(template_reservation(templates, ORG_CODE, COOKIES)[0])
+    assert legacy_search(tile, vaccine.Headers.headers_map)[0] == template_search(templates, tile)[0]
+
+    cases = [
+        measure("search.legacy", lambda: legacy_search(tile, vaccine.Headers.headers_map),
+                args.iterations, args.repeat),
+        measure("search.template", lambda: template_search(templates, tile), args.iterations, args.repeat),
+        measure("reservation.legacy", lambda: legacy_reservation(ORG_CODE, vaccine.Headers.headers_vacc, COOKIES),
+                args.iterations // 10, args.repeat),
+        measure("reservation.template", lambda: template_reservation(templates, ORG_CODE, COOKIES),
+                args.iterations, args.repeat),
+    ]
+    by_name = {case["case"]: case for case in cases}
+
+    def speedup(kind):
+        legacy, template = by_name[kind + ".legacy"], by_name[kind + ".template"]
+        return round(legacy["cpu_ns_per_call"] / max(template["cpu_ns_per_call"], 1e-9), 1)
+
+    write_result({
+        "benchmark": "request_templates",
+        "iterations": args.iterations,
+        "cases": cases,
+        "cpu_speedup": {"search": speedup("search"), "reservation": speedup("reservation")},
+    }, args.output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="request template micro-benchmark")
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write json result to this file")
+    asyncio.run(run(parser.parse_args()))
+
+
+# ===================================== run ===================================== #
+if __name__ == '__main__':
+    main()
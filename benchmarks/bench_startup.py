@@ -0,0 +1,135 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+# startup benchmark
+ - import time of vaccine-run-kakao-refac.py in a fresh interpreter (python -X importtime), top modules
+ - cold start to first search : fresh process -> config -> cookie cache hit -> /api/v1/user -> first
+   left_count_by_coords response, against mock_kakao_server
+
+# usage
+ python benchmarks/bench_startup.py --runs 10 --output bench_startup.json
+'''
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+from common import AREA, REPO_ROOT, write_result
+
+from bench_latency import server_thread
+from cookie_cache import cookie_cache
+from mock_kakao_server import mock_scenario
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_CODE = """
+import sys
+sys.path.insert(0, %(bench_dir)r)
+from common import load_vaccine_module
+load_vaccine_module()
+"""
+
+FIRST_SEARCH_CODE = """
+import asyncio, sys
+sys.path.insert(0, %(bench_dir)r)
+from common import load_vaccine_module
+vaccine = load_vaccine_module()
+vaccine.debug_config = True
+from cookie_cache import cookie_cache
+
+async def first_search():
+    async with vaccine.kakao_http_client() as http_client:
+        user_info = vaccine.kakao_user_info(http_client, cookie_cache(%(cache)r, key_path=%(key)r))
+        config = vaccine.config_vaccine_reservation()
+        config.load_config()
+        await user_info.load()
+        reservation = vaccine.vaccine_reservation(user_info, http_client, config)
+        await reservation._search_tiles(vaccine.Endpoints.left_count_by_coords(),
+                                        reservation._tile_planner.tiles_due())
+    print("READY", flush=True)
+
+asyncio.run(first_search())
+"""
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure_import(runs):
+    code = IMPORT_CODE % {"bench_dir": BENCH_DIR}
+    wall = []
+    modules = {}
+    for _ in range(runs):
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO_ROOT,
+                                   capture_output=True, text=True, check=True)
+        wall.append(time.perf_counter() - start)
+        for line in completed.stderr.splitlines():
+            match = IMPORT_LINE.match(line)
+            # 최상위 import 만 (들여쓰기 1칸) 누적 시간으로 집계합니다.
+            if match and len(match.group(3)) == 1:
+                modules.setdefault(match.group(4), []).append(int(match.group(2)))
+    top = sorted(((name, statistics.median(values) / 1000.0) for name, values in modules.items()),
+                 key=lambda item: item[1], reverse=True)[:10]
+    return wall, [{"module": name, "cumulative_ms": round(value, 3)} for name, value in top]
+
+
+def measure_first_search(runs, base_url, cache_path, key_path):
+    code = FIRST_SEARCH_CODE % {"bench_dir": BENCH_DIR, "cache": cache_path, "key": key_path}
+    env = dict(os.environ, KAKAO_VACCINE_MAP_URL=base_url, KAKAO_VACCINE_URL=base_url)
+    elapsed = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, "-c", code], cwd=tempfile.gettempdir(), env=env,
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        for line in process.stdout:
+            if line.strip() == "READY":
+                elapsed.append(time.perf_counter() - start)
+                break
+        process.wait()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="import time / cold start benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--output", help="write json result to this file")
+    args = parser.parse_args()
+
+    import_wall, import_modules = measure_import(args.runs)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        cache_path = os.path.join(work_dir, "kakao-cookie.cache")
+        key_path = os.path.join(work_dir, "cookie.key")
+        cookie_cache(cache_path, key_path=key_path).save(
+            [types.SimpleNamespace(name="_kawlt", value="benchmark", expires=None)])
+
+        runner = server_thread(mock_scenario.from_dict({"random_hospitals": 200, "area": AREA}))
+        server = runner.start()
+        try:
+            first_search = measure_first_search(args.runs, server.base_url, cache_path, key_path)
+        finally:
+            runner.stop()
+
+    def ms(values):
+        return {"median": round(statistics.median(values) * 1000, 3), "min": round(min(values) * 1000, 3),
+                "max": round(max(values) * 1000, 3)} if values else {}
+
+    write_result({
+        "benchmark": "startup",
+        "runs": args.runs,
+        "python": sys.version.split()[0],
+        "import_wall_ms": ms(import_wall),
+        "import_top_modules": import_modules,
+        "cold_start_to_first_search_ms": ms(first_search),
+    }, args.output)
+
+
+# ===================================== run ===================================== #
+if __name__ == '__main__':
+    main()
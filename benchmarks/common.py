@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+'''
+# shared helpers for benchmark scripts
+ - load vaccine-run-kakao-refac.py as a module (file name is not importable)
+ - search area, logged-in user stub and a config without files, ports, session checks or notifications
+ - percentile summary, machine-readable result output
+'''
+
+import contextlib
+import importlib.util
+import json
+import math
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+# vaccine-run-kakao-refac.py 의 debug_config 조회 범위 (min_x, min_y, max_x, max_y)
+AREA = (126.83878401599266, 37.47654763831696, 126.91759051002093, 37.539490173708266)
+VACCINE_TYPE = "VEN00013"
+
+
+def load_vaccine_module(name='vaccine_run_kakao_refac'):
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(REPO_ROOT, 'vaccine-run-kakao-refac.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class offline_user:
+    """ 로그인된 사용자 대신 사용합니다. (쿠키 없음, 세션은 항상 유효) """
+
+    def get_cookie(self):
+        return {}
+
+    async def validate(self):
+        return True
+
+    async def refresh(self):
+        return True
+
+
+def offline_config(vaccine, values=None):
+    """ AREA 를 조회하는 설정. values 의 설정 값(없는 이름은 무시)을 덮어쓴 뒤
+        파일, 포트, 세션 확인, 알림은 사용하지 않도록 합니다. (병원 정보 캐시는 메모리에만 보관) """
+    config = vaccine.config_vaccine_reservation()
+    config.vaccine_type = VACCINE_TYPE
+    config.top_left_longitude, config.bottom_right_latitude = str(AREA[0]), str(AREA[1])
+    config.bottom_right_longitude, config.top_left_latitude = str(AREA[2]), str(AREA[3])
+    for name, value in (values or {}).items():
+        if hasattr(config, name):
+            setattr(config, name, value)
+    config.hospital_cache_file = ""
+    config.metrics_file = ""
+    config.metrics_port = 0
+    config.record_traffic_file = ""
+    config.stock_history_file = ""
+    config.session_check_interval = 0
+    config.notifications = ""
+    return config
+
+
+def percentile(values, rank):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(math.ceil(rank / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summary(values, scale=1.0):
+    """ p50/p95/p99/mean/max 요약. scale 로 단위를 변환합니다. (예: 초 -> ms 는 1000) """
+    values = [value * scale for value in values]
+    if not values:
+        return {"count": 0}
+    return {"count": len(values),
+            "p50": round(percentile(values, 50), 3),
+            "p95": round(percentile(values, 95), 3),
+            "p99": round(percentile(values, 99), 3),
+            "mean": round(sum(values) / len(values), 3),
+            "max": round(max(values), 3)}
+
+
+def write_result(result, output=None):
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, 'w', encoding='utf-8') as output_file:
+            output_file.write(text + '\n')
+    print(text, file=sys.__stdout__)
+
+
+@contextlib.contextmanager
+def quiet():
+    """ 콘솔 출력을 버립니다. (출력 문자열 생성 비용은 그대로 측정됩니다.) """
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        yield
@@ -0,0 +1,76 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+# replay a recorded run (record_traffic_file) through vaccine_reservation without network
+ - same config as the recorded run (tiles, vaccine type, ranking home), hospital cache in memory
+ - --speed 1 replays at the recorded pace, --speed 10 ten times faster, --speed 0 as fast as possible
+   (retry backoff after recorded errors still waits in real time)
+ - reports replayed responses, reservation outcome and the hot path spans (decode, filter, reservation, cycle)
+
+# usage
+ python benchmarks/replay_recording.py traffic.jsonl.gz --speed 0 --output replay.json
+'''
+
+import argparse
+import asyncio
+import time
+
+from common import load_vaccine_module, offline_config, offline_user, quiet, write_result
+
+from instrumentation import hot_path_metrics
+from reservation_scheduler import reservation_stopped
+from traffic_replay import replay_finished, replay_http_client
+
+
+def replay_config(vaccine, header, speed):
+    # 기록한 실행의 설정으로 재생합니다. (파일, 포트, 세션 확인은 사용하지 않습니다.)
+    config = offline_config(vaccine, header.get("config", {}))
+    if not speed:
+        # 조회 주기만큼 기다리지 않습니다. (에러 응답 뒤의 재시도 대기는 그대로 적용됩니다.)
+        config.search_interval = 0.0
+    return config
+
+
+async def replay(path, speed):
+    vaccine = load_vaccine_module()
+    metrics = hot_path_metrics()
+    http_client = replay_http_client(path, speed=speed, metrics=metrics)
+    config = replay_config(vaccine, http_client.header, speed)
+    reservation = vaccine.vaccine_reservation(offline_user(), http_client, config)
+
+    start = time.perf_counter()
+    finished = "reserved"
+    with quiet():
+        try:
+            await reservation.find_vaccine()
+        except replay_finished:
+            finished = "end of recording"
+        except reservation_stopped as stopped:
+            finished = stopped.code
+    elapsed = time.perf_counter() - start
+
+    return {
+        "benchmark": "replay",
+        "recording": path,
+        "speed": speed,
+        "finished": finished,
+        "elapsed_s": round(elapsed, 3),
+        "recorded_searches": http_client.search_count,
+        "replayed_responses": http_client.replayed,
+        "unrecorded_reservations": http_client.unrecorded_reservations,
+        "spans": metrics.snapshot(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="replay recorded kakao api traffic")
+    parser.add_argument("recording", help="record_traffic_file of a previous run")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier, 0 for no waiting")
+    parser.add_argument("--output", help="write json result to this file")
+    args = parser.parse_args()
+    write_result(asyncio.run(replay(args.recording, args.speed)), args.output)
+
+
+# ===================================== run ===================================== #
+if __name__ == '__main__':
+    main()
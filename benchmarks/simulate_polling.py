@@ -0,0 +1,445 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+# deterministic simulator for the polling / reservation logic
+ - vaccine_reservation runs unchanged on an event loop with a virtual clock : whenever nothing is ready the clock
+   jumps to the next timer, so asyncio.sleep, timeouts, backoff and circuit breaker waits cost no real time
+ - synthetic hospital population with stock episodes following clinic hours, each episode is taken by someone
+   else after a random lifetime unless we book it first. served in-process, no sockets
+ - same seed, same population and same answers for every configuration, so policies can be compared directly
+ - after each booking the search restarts, every stock episode of the simulated period counts
+ - reports per configuration : detection latency (stock appears -> first search response showing it),
+   reservation latency (-> first reservation POST), success rate, search / wasted request counts
+ - history-driven schedules (search_interval_quiet) get --history-days of earlier episodes as stock history
+
+# usage
+ python benchmarks/simulate_polling.py --hours 24 --config fixed:search_interval=0.5
+     --config relaxed:search_interval=1 --config history:search_interval=0.5,search_interval_quiet=5
+ (the real vaccine_reservation hot path runs for every simulated search : a 24 h day with 50 hospitals at 0.5 s
+  takes about a minute, more hospitals or shorter intervals take proportionally longer)
+'''
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import logging
+import os
+import random
+import selectors
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+from common import AREA, load_vaccine_module, offline_config, offline_user, quiet, summary, write_result
+
+from kakao_http import kakao_http_client, kakao_http_error
+from mock_kakao_server import FAILURE_DESC, generate_hospitals
+from stock_history import stock_history
+
+# 시간대(0 ~ 23시)별 잔여백신이 나오는 상대 빈도. 진료 시간에 몰리고 밤에는 나오지 않습니다.
+CLINIC_HOURS = (0, 0, 0, 0, 0, 0, 0, 0.2, 0.6, 1.0, 1.0, 0.8, 0.5, 0.7, 0.9, 0.9, 1.0, 1.2, 0.6, 0.1, 0, 0, 0, 0)
+
+DEFAULT_CONFIGS = ("fixed:search_interval=0.5",
+                   "relaxed:search_interval=1",
+                   "history:search_interval=0.5,search_interval_quiet=5")
+
+
+class virtual_selector(selectors.BaseSelector):
+    """ 기다릴 것이 없으면 실제로 기다리지 않고 가상 시계를 다음 타이머까지 옮깁니다. """
+
+    def __init__(self, loop):
+        self._loop = loop
+        self._selector = selectors.DefaultSelector()
+
+    def register(self, fileobj, events, data=None):
+        return self._selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self._selector.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        return self._selector.modify(fileobj, events, data)
+
+    def get_map(self):
+        return self._selector.get_map()
+
+    def close(self):
+        self._selector.close()
+
+    def select(self, timeout=None):
+        events = self._selector.select(0)
+        if events:
+            return events
+        if timeout is None:
+            raise RuntimeError("simulation stalled : nothing is scheduled")
+        self._loop.advance(timeout)
+        return []
+
+
+class inline_executor(concurrent.futures.ThreadPoolExecutor):
+    # asyncio.to_thread 작업(stock history 집계 등)을 스레드 없이 바로 실행해서 실행 순서가 실제 스레드에 좌우되지 않도록 합니다.
+    # (loop.set_default_executor 는 ThreadPoolExecutor 만 받습니다.)
+    def submit(self, fn, /, *args, **kwargs):
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as error:
+            future.set_exception(error)
+        return future
+
+
+class virtual_event_loop(asyncio.SelectorEventLoop):
+    def __init__(self):
+        self._virtual_time = 0.0
+        super().__init__(selector=virtual_selector(self))
+        self.set_default_executor(inline_executor())
+
+    def time(self):
+        return self._virtual_time
+
+    def advance(self, seconds):
+        self._virtual_time += seconds
+
+
+class stock_episode:
+    __slots__ = ('hospital', 'start', 'end', 'left', 'first_seen', 'first_post', 'booked')
+
+    def __init__(self, hospital, start, end, left):
+        self.hospital = hospital
+        self.start = start
+        self.end = end
+        self.left = left
+        self.first_seen = None
+        self.first_post = None
+        self.booked = 0
+
+
+class synthetic_population:
+    def __init__(self, hospitals=200, area=AREA, seconds=86400.0, history_seconds=0.0, episodes_per_day=60,
+                 lifetime=60.0, day_offset=0.0, rng=None):
+        # 시각은 시뮬레이션 시작(0)부터의 초. day_offset : 시작 시각의 자정 이후 초
+        self.hospitals = {hospital["orgCode"]: hospital
+                          for hospital in generate_hospitals(hospitals, area, rng.randrange(1 << 30))}
+        codes = list(self.hospitals)
+        # 일부 병원에서 잔여백신이 훨씬 자주 나옵니다.
+        activity = [rng.paretovariate(1.5) for _ in codes]
+        self.episodes = []
+        self.history = []
+        day = -int((history_seconds + day_offset) // 86400) - 1
+        while day * 86400 - day_offset < seconds:
+            for _ in range(episodes_per_day):
+                hour = rng.choices(range(24), weights=CLINIC_HOURS)[0]
+                start = day * 86400 + hour * 3600 + rng.uniform(0, 3600) - day_offset
+                if not -history_seconds <= start < seconds:
+                    continue
+                episode = stock_episode(rng.choices(codes, weights=activity)[0], start,
+                                        start + rng.expovariate(1.0 / lifetime), rng.randint(1, 3))
+                (self.episodes if start >= 0 else self.history).append(episode)
+            day += 1
+        self.episodes = self._without_overlap(self.episodes)
+        self.history = self._without_overlap(self.history)
+        self._active = {}  # orgCode -> stock_episode
+        self._next = 0
+        self._version = 0
+        self._tiles = {}
+        self._responses = {}
+
+    @staticmethod
+    def _without_overlap(episodes):
+        # 한 병원의 잔여백신 기간이 겹치지 않도록 합니다.
+        last_end = {}
+        result = []
+        for episode in sorted(episodes, key=lambda episode: episode.start):
+            if episode.start < last_end.get(episode.hospital, float('-inf')):
+                continue
+            last_end[episode.hospital] = episode.end
+            result.append(episode)
+        return result
+
+    def advance(self, now):
+        changed = False
+        while self._next < len(self.episodes) and self.episodes[self._next].start <= now:
+            episode = self.episodes[self._next]
+            self._next += 1
+            self._active[episode.hospital] = episode
+            changed = True
+        for org_code, episode in list(self._active.items()):
+            if episode.end <= now or episode.left <= 0:
+                del self._active[org_code]
+                changed = True
+        if changed:
+            self._version += 1
+
+    def search(self, body, now):
+        self.advance(now)
+        codes = self._tiles.get(body)
+        if codes is None:
+            request = json.loads(body)
+            min_x, max_x = sorted((request["topLeft"]["x"], request["bottomRight"]["x"]))
+            min_y, max_y = sorted((request["topLeft"]["y"], request["bottomRight"]["y"]))
+            codes = self._tiles[body] = [code for code, hospital in self.hospitals.items()
+                                         if min_x <= hospital["x"] <= max_x and min_y <= hospital["y"] <= max_y]
+        stocked = [self._active[code] for code in codes if code in self._active]
+        for episode in stocked:
+            if episode.first_seen is None:
+                episode.first_seen = now
+        key = (body, self._version)
+        response = self._responses.get(key)
+        if response is None:
+            organizations = []
+            for code in codes:
+                hospital = self.hospitals[code]
+                episode = self._active.get(code)
+                organizations.append({"orgCode": code, "orgName": hospital["orgName"],
+                                      "address": hospital["address"], "x": hospital["x"], "y": hospital["y"],
+                                      "status": "AVAILABLE" if episode else "EXHAUSTED",
+                                      "leftCounts": episode.left if episode else 0})
+            self._responses.clear()
+            response = self._responses[key] = json.dumps({"organizations": organizations}).encode('utf-8')
+        return response, bool(stocked)
+
+    def reserve(self, org_code, now):
+        self.advance(now)
+        episode = self._active.get(org_code)
+        if episode is None:
+            return {"code": "NO_VACANCY", "desc": FAILURE_DESC["NO_VACANCY"]}
+        if episode.first_post is None:
+            episode.first_post = now
+        episode.left -= 1
+        episode.booked += 1
+        if episode.left <= 0:
+            del self._active[org_code]
+        self._version += 1
+        return {"code": "SUCCESS", "desc": "", "organization": dict(self.hospitals[org_code])}
+
+
+class simulated_kakao_api(kakao_http_client):
+    def __init__(self, population, rng, latency=0.05, jitter=0.05, error_rate=0.0, timeout_rate=0.0, metrics=None):
+        super().__init__(metrics=metrics)
+        self.population = population
+        self._rng = rng
+        self.latency = latency  # 기본 응답 지연. 단위: 초
+        self.jitter = jitter  # 0 ~ jitter 사이의 추가 지연. 단위: 초
+        self.error_rate = error_rate  # 503 응답 확률
+        self.timeout_rate = timeout_rate  # 응답하지 않을 확률 (요청 제한 시간 후 TimeoutError)
+        self.search_count = 0
+        self.empty_searches = 0
+        self.search_errors = 0
+        self.reservation_count = 0
+        self.failed_reservations = 0
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def post_bytes(self, url, data, headers, cookies=None, timeout=None, span=None):
+        loop = asyncio.get_running_loop()
+        if self.timeout_rate and self._rng.random() < self.timeout_rate:
+            await asyncio.sleep(getattr(timeout, 'total', None) or 5.0)
+            self._count_error(span)
+            raise asyncio.TimeoutError()
+        await asyncio.sleep(self.latency + self._rng.uniform(0, self.jitter))
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self._count_error(span)
+            raise kakao_http_error(503)
+
+        if span == 'reservation':
+            self.reservation_count += 1
+            response = self.population.reserve(json.loads(data)["orgCode"], loop.time())
+            if response["code"] != "SUCCESS":
+                self.failed_reservations += 1
+            return json.dumps(response).encode('utf-8')
+
+        self.search_count += 1
+        body, stocked = self.population.search(bytes(data), loop.time())
+        if not stocked:
+            self.empty_searches += 1
+        return body
+
+    async def get_json(self, url, headers, cookies=None, timeout=None, span=None):
+        return {"user": {"name": "simulation", "status": "NORMAL"}}
+
+    def _count_error(self, span):
+        if span == 'reservation':
+            self.reservation_count += 1
+            self.failed_reservations += 1
+        else:
+            self.search_count += 1
+            self.search_errors += 1
+
+
+def parse_config(spec):
+    """ 'name:key=value,key=value' -> (name, {key: value}) """
+    name, _, assignments = spec.partition(':')
+    values = {}
+    for assignment in filter(None, (item.strip() for item in assignments.split(','))):
+        key, _, value = assignment.partition('=')
+        values[key.strip()] = value.strip()
+    return name.strip(), values
+
+
+def build_config(vaccine, overrides):
+    config = offline_config(vaccine)
+    # 화면은 거의 다시 그리지 않습니다.
+    config.display_fps = 0.1
+    for name, value in overrides.items():
+        if not hasattr(config, name):
+            raise ValueError("unknown config key : %s" % name)
+        current = getattr(config, name)
+        if isinstance(current, bool):
+            value = value.lower() in ('1', 'true', 'yes')
+        elif isinstance(current, int):
+            value = int(value)
+        elif isinstance(current, float):
+            value = float(value)
+        setattr(config, name, value)
+    if 'search_interval_quiet' not in overrides:
+        # 시간대별 조회 주기는 설정에서 지정한 경우에만 사용합니다.
+        config.search_interval_quiet = config.search_interval
+    return config
+
+
+def make_population(args):
+    start = datetime.fromisoformat(args.start)
+    return synthetic_population(args.hospitals, AREA, args.hours * 3600, args.history_days * 86400,
+                                args.episodes_per_day, args.lifetime,
+                                start.hour * 3600 + start.minute * 60 + start.second, random.Random(args.seed))
+
+
+def write_history(path, population, start_epoch, history_seconds):
+    """ 시뮬레이션 시작 전 기간의 잔여백신 기록을 stock_history 형식으로 만듭니다. (그 기간 내내 조회했다고 가정) """
+    now = [0.0]
+    history = stock_history(path, flush_interval=float('inf'), clock=lambda: start_epoch + now[0])
+    episodes = iter(population.history)
+    episode = next(episodes, None)
+    hour = -history_seconds
+    while hour < 0:
+        now[0] = hour
+        history.observe()
+        while episode is not None and episode.start < hour + 3600:
+            now[0] = episode.start
+            history.record(dict(population.hospitals[episode.hospital], leftCounts=episode.left))
+            episode = next(episodes, None)
+        hour += 3600
+    history.flush()
+
+
+def run_configuration(vaccine, name, overrides, args, history_path=None):
+    rng_seed = args.seed
+    population = make_population(args)
+    api = simulated_kakao_api(population, random.Random(rng_seed + 1), args.latency, args.jitter, args.error_rate,
+                              args.timeout_rate)
+    config = build_config(vaccine, overrides)
+    workdir = tempfile.mkdtemp(prefix='simulate-polling-')
+    if history_path and config.search_interval_quiet > config.search_interval:
+        config.stock_history_file = os.path.join(workdir, 'stock-history.bin')
+        shutil.copyfile(history_path, config.stock_history_file)
+
+    loop = virtual_event_loop()
+    start_epoch = args.start_epoch
+    bookings = 0
+    real_start = time.perf_counter()
+    try:
+        reservation = vaccine.vaccine_reservation(offline_user(), api, config, clock=loop.time,
+                                                  wall_clock=lambda: start_epoch + loop.time(),
+                                                  rng=random.Random(rng_seed + 2))
+        end_time = args.hours * 3600
+
+        async def simulate():
+            nonlocal bookings
+            while loop.time() < end_time:
+                try:
+                    await asyncio.wait_for(reservation.find_vaccine(), end_time - loop.time())
+                except asyncio.TimeoutError:
+                    break
+                bookings += 1
+
+        with quiet():
+            loop.run_until_complete(simulate())
+    finally:
+        loop.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+    real_elapsed = time.perf_counter() - real_start
+
+    episodes = [episode for episode in population.episodes if episode.start < args.hours * 3600]
+    detected = [episode.first_seen - episode.start for episode in episodes if episode.first_seen is not None]
+    posted = [episode.first_post - episode.start for episode in episodes if episode.first_post is not None]
+    booked = sum(1 for episode in episodes if episode.booked)
+    return {
+        "config": name,
+        "overrides": overrides,
+        "episodes": len(episodes),
+        "booked_episodes": booked,
+        "bookings": bookings,
+        "success_rate": round(booked / len(episodes), 4) if episodes else None,
+        "missed_episodes": len(episodes) - len(detected),
+        "detection_latency_s": summary(detected),
+        "reservation_latency_s": summary(posted),
+        "searches": api.search_count,
+        "empty_searches": api.empty_searches,
+        "search_errors": api.search_errors,
+        "reservations": api.reservation_count,
+        "failed_reservations": api.failed_reservations,
+        "wasted_requests": api.empty_searches + api.search_errors + api.failed_reservations,
+        "searches_per_booking": round(api.search_count / booked, 1) if booked else None,
+        "stats": reservation.stats,
+        "real_time_s": round(real_elapsed, 3),
+        "speedup": round(args.hours * 3600 / real_elapsed, 1) if real_elapsed else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="virtual clock simulation of the polling and reservation logic")
+    parser.add_argument("--config", action="append", metavar="NAME:KEY=VALUE,...",
+                        help="configuration to simulate (repeatable), config.ini keys of [config]")
+    parser.add_argument("--hours", type=float, default=24.0, help="simulated hours")
+    parser.add_argument("--start", default="2021-08-02T00:00", help="local time the simulation starts at")
+    parser.add_argument("--hospitals", type=int, default=50)
+    parser.add_argument("--episodes-per-day", type=int, default=60, help="stock appearances per day")
+    parser.add_argument("--lifetime", type=float, default=60.0, help="mean seconds before someone else takes the stock")
+    parser.add_argument("--history-days", type=int, default=7, help="days of stock history before the start")
+    parser.add_argument("--latency", type=float, default=0.05, help="api latency (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.05, help="api jitter (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of a 503 response")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="probability of a request timeout")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write json result to this file")
+    args = parser.parse_args()
+    args.start_epoch = datetime.fromisoformat(args.start).timestamp()
+
+    vaccine = load_vaccine_module()
+    # 조회 에러 등의 경고 로그는 결과 출력에 섞이지 않도록 끕니다.
+    logging.disable(logging.CRITICAL)
+
+    history_path = None
+    workdir = tempfile.mkdtemp(prefix='simulate-history-')
+    try:
+        if args.history_days:
+            population = make_population(args)
+            history_path = os.path.join(workdir, 'stock-history.bin')
+            write_history(history_path, population, args.start_epoch, args.history_days * 86400)
+        results = [run_configuration(vaccine, name, overrides, args, history_path)
+                   for name, overrides in map(parse_config, args.config or DEFAULT_CONFIGS)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    write_result({
+        "benchmark": "simulate_polling",
+        "hours": args.hours,
+        "start": args.start,
+        "hospitals": args.hospitals,
+        "episodes_per_day": args.episodes_per_day,
+        "lifetime_s": args.lifetime,
+        "history_days": args.history_days,
+        "seed": args.seed,
+        "results": results,
+    }, args.output)
+
+
+# ===================================== run ===================================== #
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+'''
+# candidate ranking
+ - score organizations by leftCounts, distance from home and reservation history
+ - only the top-N candidates are handed to the reservation scheduler
+'''
+
+import math
+import time
+
+
+def distance_km(longitude1, latitude1, longitude2, latitude2):
+    """ 두 좌표 사이의 거리(km, haversine) """
+    lon1, lat1, lon2, lat2 = map(math.radians, (longitude1, latitude1, longitude2, latitude2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 6371.0 * 2 * math.asin(math.sqrt(a))
+
+
+class candidate_ranking:
+    # 점수 가중치
+    left_count_weight = 1.0  # log2(1 + leftCounts) 당
+    distance_weight = 0.5  # km 당 감점
+    success_weight = 2.0  # 과거 예약 성공 1회 당
+    failure_weight = 1.0  # 과거 예약 실패 1회 당 (시간이 지나면 감소)
+    failure_half_life = 600.0  # 실패 감점이 절반으로 줄어드는 시간. 단위: 초
+
+    def __init__(self, home_longitude=None, home_latitude=None, top_n=10, clock=time.time):
+        self.home_longitude = home_longitude
+        self.home_latitude = home_latitude
+        self.top_n = top_n
+        self._clock = clock  # 재시작 후 복원한 기록도 이어서 감소하도록 wall clock 을 사용합니다.
+        self._history = {}  # orgCode -> [success, failure, 마지막 실패 시각]
+
+    def score(self, org):
+        score = self.left_count_weight * math.log2(1 + max(org.get('leftCounts') or 0, 0))
+
+        if self.home_longitude is not None and self.home_latitude is not None:
+            try:
+                score -= self.distance_weight * distance_km(self.home_longitude, self.home_latitude,
+                                                            float(org['x']), float(org['y']))
+            except (KeyError, TypeError, ValueError):
+                pass
+
+        history = self._history.get(org.get('orgCode'))
+        if history is not None:
+            score += self.success_weight * history[0] - self.failure_weight * self._failure(history, self._clock())
+        return score
+
+    def _failure(self, history, now):
+        # 마지막 실패 이후 지난 시간만큼 실패 횟수를 줄입니다.
+        _, failure, failed_at = history
+        if not failure:
+            return 0.0
+        return failure * 0.5 ** (max(now - failed_at, 0.0) / self.failure_half_life)
+
+    def rank(self, orgs):
+        ranked = sorted(orgs, key=self.score, reverse=True)
+        if self.top_n:
+            return ranked[:self.top_n]
+        return ranked
+
+    def history(self):
+        return {org_code: list(history) for org_code, history in self._history.items()}
+
+    def restore_history(self, history):
+        for org_code, (success, failure, failed_at) in (history or {}).items():
+            self._history[org_code] = [int(success), float(failure), float(failed_at)]
+
+    def record(self, org_code, success):
+        history = self._history.setdefault(org_code, [0, 0.0, 0.0])
+        if success:
+            history[0] += 1
+        else:
+            now = self._clock()
+            history[1] = self._failure(history, now) + 1
+            history[2] = now
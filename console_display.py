@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+'''
+# console status display
+ - the polling loop only updates state, a background task redraws at most max_fps times per second
+ - in-place status panel (ansi escape, virtual terminal mode enabled on windows consoles)
+ - last cycle summary, search latency stats, recently changed hospitals
+ - one-off messages (reservation attempt / result, errors) are printed above the panel
+ - plain line output when stdout is not a terminal
+'''
+
+import asyncio
+import os
+import sys
+from collections import deque
+from datetime import datetime
+
+_CLEAR_PANEL = "\x1b[%dF\x1b[J"
+
+
+def enable_ansi():
+    """ windows 콘솔에서 ansi escape 를 사용할 수 있도록 virtual terminal 모드를 켭니다. """
+    if os.name != 'nt':
+        return True
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+        mode = ctypes.c_uint32()
+        if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            return False
+        return bool(kernel32.SetConsoleMode(handle, mode.value | 0x0004))  # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+    except (AttributeError, OSError):
+        return False
+
+
+class status_display:
+    def __init__(self, hospitals=None, metrics=None, max_fps=4, recent_changes=5):
+        self._hospitals = hospitals
+        self._metrics = metrics
+        self.max_fps = max(0.1, float(max_fps))
+        self._summary = {}
+        self._recent = deque(maxlen=recent_changes)
+        self._cycles = 0
+        self._dirty = False
+        self._panel_lines = 0
+        self._ansi = None
+        self._task = None
+
+    @property
+    def _stream(self):
+        # redirect_stdout 등으로 바뀐 stdout 에도 출력되도록 매번 가져옵니다.
+        return sys.stdout
+
+    def start(self):
+        stream = self._stream
+        self._ansi = bool(getattr(stream, 'isatty', lambda: False)()) and enable_ansi()
+        self._task = asyncio.ensure_future(self._render_loop())
+        return self
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._dirty:
+            self.render()
+
+    def update(self, **summary):
+        self._summary.update(summary)
+        self._cycles += 1
+        self._dirty = True
+
+    def changes(self, transitions):
+        for transition in transitions:
+            org = transition.org
+            if transition.is_new and (org.get('status') == "CLOSED" or org.get('status') == "EXHAUSTED"):
+                continue
+            self._recent.appendleft((datetime.now(), transition))
+            self._dirty = True
+
+    def message(self, *texts):
+        """ 패널 위에 바로 출력합니다. (예약 진행, 결과, 에러 등 드물게 발생하는 메시지) """
+        self._clear_panel()
+        print(*texts, file=self._stream)
+        self._dirty = True
+
+    def _clear_panel(self):
+        if self._ansi and self._panel_lines:
+            self._stream.write(_CLEAR_PANEL % self._panel_lines)
+        self._panel_lines = 0
+
+    async def _render_loop(self):
+        while True:
+            await asyncio.sleep(1.0 / self.max_fps)
+            if self._dirty:
+                self.render()
+
+    def render(self):
+        self._dirty = False
+        lines = self._panel()
+        if not self._ansi:
+            # 터미널이 아니면 요약 한 줄만 출력합니다.
+            print(lines[1], file=self._stream)
+            return
+        self._clear_panel()
+        self._stream.write("\n".join(lines) + "\n")
+        self._stream.flush()
+        self._panel_lines = len(lines)
+
+    def _latency_text(self):
+        histogram = self._metrics.histograms.get('search.request') if self._metrics is not None else None
+        if histogram is None or not histogram.count:
+            latency = self._summary.get('latency')
+            return "검색 시간 : %s 초" % (round(latency, 3) if latency is not None else "-")
+        snapshot = histogram.snapshot()
+        return "검색 시간(ms) p50 : %s  p95 : %s  max : %s" % (snapshot['p50_ms'], snapshot['p95_ms'],
+                                                           snapshot['max_ms'])
+
+    def _panel(self):
+        summary = self._summary
+        lines = ["--------------------------------------------------",
+                 "%s  조회 %d회  조회 영역 수 : %s  조회 병원 수 : %s  변경 병원 수 : %s  다음 조회 : %s 초" % (
+                     datetime.now().strftime('%H:%M:%S'), self._cycles, summary.get('tiles', '-'),
+                     summary.get('organizations', '-'), summary.get('changed', '-'),
+                     round(summary['interval'], 2) if summary.get('interval') is not None else '-'),
+                 self._latency_text()]
+        for changed_at, transition in self._recent:
+            org = transition.org
+            metadata = (self._hospitals.get(org.get('orgCode')) if self._hospitals is not None else None) or {}
+            lines.append(f"{changed_at.strftime('%H:%M:%S')}\t"
+                         f"잔여갯수: {transition.previous_left_counts} -> {org.get('leftCounts')}\t"
+                         f"상태: {transition.previous_status} -> {org.get('status')}\t"
+                         f"기관명: {metadata.get('orgName')}")
+        return lines
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+'''
+# encrypted local cache of the .kakao.com cookies
+ - skips decrypting the whole chrome cookie store (browser_cookie3) on restart
+ - expires at the earliest cookie expiry or after ttl seconds, whichever comes first
+ - windows : DPAPI (CryptProtectData), others : AES-GCM with a per-user key file (0600)
+'''
+
+import json
+import logging
+import os
+import time
+
+NONCE_SIZE = 12
+TAG_SIZE = 16
+
+
+def _default_key_path():
+    return os.path.join(os.path.expanduser('~'), '.kakao-vaccine-macro.key')
+
+
+class _dpapi:
+    """ windows 사용자 계정으로 보호되는 DPAPI 암호화 """
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+
+        class DATA_BLOB(ctypes.Structure):
+            _fields_ = [('cbData', wintypes.DWORD), ('pbData', ctypes.POINTER(ctypes.c_char))]
+
+        self._ctypes = ctypes
+        self._blob = DATA_BLOB
+        self._crypt32 = ctypes.windll.crypt32
+        self._kernel32 = ctypes.windll.kernel32
+
+    def _call(self, function, data):
+        ctypes = self._ctypes
+        buffer = ctypes.create_string_buffer(data, len(data))
+        blob_in = self._blob(len(data), ctypes.cast(buffer, ctypes.POINTER(ctypes.c_char)))
+        blob_out = self._blob()
+        if not function(ctypes.byref(blob_in), None, None, None, None, 0, ctypes.byref(blob_out)):
+            raise OSError("DPAPI error")
+        try:
+            return ctypes.string_at(blob_out.pbData, blob_out.cbData)
+        finally:
+            self._kernel32.LocalFree(blob_out.pbData)
+
+    def encrypt(self, data):
+        return self._call(self._crypt32.CryptProtectData, data)
+
+    def decrypt(self, data):
+        return self._call(self._crypt32.CryptUnprotectData, data)
+
+
+class _aes_gcm:
+    def __init__(self, key_path):
+        self._key_path = key_path
+
+    def _key(self):
+        try:
+            with open(self._key_path, 'rb') as key_file:
+                key = key_file.read()
+            if len(key) == 32:
+                return key
+        except OSError:
+            pass
+        key = os.urandom(32)
+        descriptor = os.open(self._key_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, 'wb') as key_file:
+            key_file.write(key)
+        return key
+
+    def encrypt(self, data):
+        from Cryptodome.Cipher import AES
+        nonce = os.urandom(NONCE_SIZE)
+        cipher = AES.new(self._key(), AES.MODE_GCM, nonce=nonce)
+        encrypted, tag = cipher.encrypt_and_digest(data)
+        return nonce + tag + encrypted
+
+    def decrypt(self, data):
+        from Cryptodome.Cipher import AES
+        nonce, tag, encrypted = data[:NONCE_SIZE], data[NONCE_SIZE:NONCE_SIZE + TAG_SIZE], data[NONCE_SIZE + TAG_SIZE:]
+        cipher = AES.new(self._key(), AES.MODE_GCM, nonce=nonce)
+        return cipher.decrypt_and_verify(encrypted, tag)
+
+
+class cookie_cache:
+    def __init__(self, path='kakao-cookie.cache', ttl=6 * 3600, key_path=None):
+        self.path = path
+        self.ttl = ttl  # 쿠키 만료와 별개로 캐시를 사용할 최대 시간. 단위: 초
+        self._cipher = _dpapi() if os.name == 'nt' else _aes_gcm(key_path or _default_key_path())
+
+    def load(self):
+        """ 만료되지 않은 쿠키 dict 를 반환합니다. 없거나, 만료되었거나, 복호화할 수 없으면 None """
+        try:
+            with open(self.path, 'rb') as cache_file:
+                entry = json.loads(self._cipher.decrypt(cache_file.read()))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, ImportError) as error:
+            logging.warning("cookie cache load error : %s", error)
+            return None
+
+        if entry.get('expires_at', 0) <= time.time():
+            self.clear()
+            return None
+        return entry.get('cookies') or None
+
+    def save(self, cookiejar):
+        cookies = {cookie.name: cookie.value for cookie in cookiejar}
+        if not cookies:
+            return False
+        expires_at = time.time() + self.ttl
+        cookie_expires = [cookie.expires for cookie in cookiejar if cookie.expires]
+        if cookie_expires:
+            expires_at = min(expires_at, min(cookie_expires))
+
+        data = json.dumps({"expires_at": expires_at, "cookies": cookies}).encode('utf-8')
+        try:
+            encrypted = self._cipher.encrypt(data)
+            descriptor = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(descriptor, 'wb') as cache_file:
+                cache_file.write(encrypted)
+        except (OSError, ImportError) as error:
+            logging.warning("cookie cache save error : %s", error)
+            return False
+        return True
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
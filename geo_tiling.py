@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+'''
+# spatial tiling of the search area
+ - grid index of known hospital coordinates, built from past search responses
+ - the search area is split into rows x cols tiles with priorities
+ - hot tiles (near home, frequent stock) are searched every cycle, cold tiles every cold_every cycles,
+   tiles without any known hospital even less often
+'''
+
+import math
+
+from candidate_ranking import distance_km
+
+
+class hospital_grid_index:
+    def __init__(self, cell_size=0.005):
+        self.cell_size = cell_size  # 격자 한 칸의 크기. 단위: 도 (약 500m)
+        self._cells = {}  # (col, row) -> set(orgCode)
+        self._coords = {}  # orgCode -> (x, y)
+
+    def __len__(self):
+        return len(self._coords)
+
+    def _cell(self, x, y):
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+
+    def insert(self, org_code, x, y):
+        previous = self._coords.get(org_code)
+        if previous == (x, y):
+            return
+        if previous is not None:
+            self._cells.get(self._cell(*previous), set()).discard(org_code)
+        self._coords[org_code] = (x, y)
+        self._cells.setdefault(self._cell(x, y), set()).add(org_code)
+
+    def query(self, min_x, min_y, max_x, max_y):
+        min_col, min_row = self._cell(min_x, min_y)
+        max_col, max_row = self._cell(max_x, max_y)
+        found = []
+        for col in range(min_col, max_col + 1):
+            for row in range(min_row, max_row + 1):
+                for org_code in self._cells.get((col, row), ()):
+                    x, y = self._coords[org_code]
+                    if min_x <= x <= max_x and min_y <= y <= max_y:
+                        found.append(org_code)
+        return found
+
+    def get(self, org_code):
+        return self._coords.get(org_code)
+
+
+class search_tile:
+    __slots__ = ('index', 'min_x', 'min_y', 'max_x', 'max_y', 'searched', 'hospital_count', 'stock_hits',
+                 'stock_rate', 'priority')
+
+    def __init__(self, index, min_x, min_y, max_x, max_y):
+        self.index = index
+        self.min_x = min_x
+        self.min_y = min_y
+        self.max_x = max_x
+        self.max_y = max_y
+        self.searched = False
+        self.hospital_count = 0
+        self.stock_hits = 0.0
+        self.stock_rate = 0.0  # 지금 시간대에 잔여백신이 나왔던 비율 (stock_history, 가장 높은 타일이 1)
+        self.priority = 0.0
+
+    def contains(self, x, y):
+        return self.min_x <= x <= self.max_x and self.min_y <= y <= self.max_y
+
+    def center(self):
+        return (self.min_x + self.max_x) / 2, (self.min_y + self.max_y) / 2
+
+    def body(self):
+        # left_count_by_coords 요청 본문
+        return {"bottomRight": {"x": self.max_x, "y": self.min_y},
+                "topLeft": {"x": self.min_x, "y": self.max_y},
+                "onlyLeft": False, "order": "latitude"}
+
+
+class tile_planner:
+    stock_weight = 1.0  # 잔여백신이 나온 횟수(감소 적용) 당 점수
+    stock_decay = 0.99  # 잔여백신 기록이 추가될 때마다 다른 기록에 곱해지는 값
+    rate_weight = 2.0  # 시간대별 잔여백신 비율(0 ~ 1) 당 점수
+
+    def __init__(self, top_left_longitude, top_left_latitude, bottom_right_longitude, bottom_right_latitude,
+                 rows=1, cols=1, home=None, hot_count=2, cold_every=5, empty_every=20):
+        min_x, max_x = sorted((float(top_left_longitude), float(bottom_right_longitude)))
+        min_y, max_y = sorted((float(top_left_latitude), float(bottom_right_latitude)))
+        self.rows = max(1, int(rows))
+        self.cols = max(1, int(cols))
+        self.home = home if home and None not in home else ((min_x + max_x) / 2, (min_y + max_y) / 2)
+        self.hot_count = hot_count  # 매 조회마다 검색할 우선순위 상위 타일 수
+        self.cold_every = max(1, int(cold_every))  # 나머지 타일의 검색 간격. 단위: 조회 횟수
+        self.empty_every = max(1, int(empty_every))  # 알려진 병원이 없는 타일의 검색 간격. 단위: 조회 횟수
+        self.index = hospital_grid_index()
+        self._cycle = 0
+
+        width = (max_x - min_x) / self.cols
+        height = (max_y - min_y) / self.rows
+        self.tiles = []
+        for row in range(self.rows):
+            for col in range(self.cols):
+                self.tiles.append(search_tile(len(self.tiles),
+                                              min_x + col * width, min_y + row * height,
+                                              min_x + (col + 1) * width, min_y + (row + 1) * height))
+        self._update_priority()
+
+    def tiles_due(self):
+        """ 이번 조회에서 검색할 타일 목록. 모든 타일을 한 번씩 검색하기 전까지는 전체를 반환합니다. """
+        cycle = self._cycle
+        self._cycle += 1
+        if len(self.tiles) == 1 or not all(tile.searched for tile in self.tiles):
+            return list(self.tiles)
+
+        ranked = sorted(self.tiles, key=lambda tile: tile.priority, reverse=True)
+        due = []
+        for rank, tile in enumerate(ranked):
+            if rank < self.hot_count and tile.hospital_count:
+                due.append(tile)
+                continue
+            every = self.cold_every if tile.hospital_count else self.empty_every
+            # 검색 시점을 타일마다 다르게 해서 요청이 한 조회에 몰리지 않도록 합니다.
+            if (cycle + tile.index) % every == 0:
+                due.append(tile)
+        return due
+
+    def observe(self, tile, organizations):
+        """ 타일 검색 결과로 병원 좌표 색인을 갱신합니다. """
+        for org in organizations:
+            try:
+                self.index.insert(org.get('orgCode'), float(org.get('x')), float(org.get('y')))
+            except (TypeError, ValueError):
+                continue
+        if not tile.searched or len(organizations) != tile.hospital_count:
+            tile.searched = True
+            tile.hospital_count = len(self.index.query(tile.min_x, tile.min_y, tile.max_x, tile.max_y))
+            self._update_priority()
+
+    def record_stock(self, org):
+        coords = self.index.get(org.get('orgCode'))
+        if coords is None:
+            return
+        for tile in self.tiles:
+            tile.stock_hits *= self.stock_decay
+            if tile.contains(*coords):
+                tile.stock_hits += 1
+        self._update_priority()
+
+    def set_stock_rates(self, rates):
+        """ 시간대별 기록(stock_history)에서 구한 타일별 비율을 우선순위에 반영합니다. None 이면 해제 """
+        for tile, rate in zip(self.tiles, rates or [0.0] * len(self.tiles)):
+            tile.stock_rate = rate
+        self._update_priority()
+
+    def grid(self):
+        """ (min_x, min_y, max_x, max_y, rows, cols) """
+        first, last = self.tiles[0], self.tiles[-1]
+        return first.min_x, first.min_y, last.max_x, last.max_y, self.rows, self.cols
+
+    def state(self):
+        return {"rows": self.rows, "cols": self.cols, "stock_hits": [tile.stock_hits for tile in self.tiles]}
+
+    def restore(self, state):
+        """ 같은 타일 구성으로 저장한 잔여백신 기록만 복원합니다. """
+        if not state or state.get("rows") != self.rows or state.get("cols") != self.cols:
+            return False
+        for tile, stock_hits in zip(self.tiles, state.get("stock_hits", ())):
+            tile.stock_hits = float(stock_hits)
+        self._update_priority()
+        return True
+
+    def _update_priority(self):
+        home_x, home_y = self.home
+        for tile in self.tiles:
+            center_x, center_y = tile.center()
+            proximity = 1.0 / (1.0 + distance_km(home_x, home_y, center_x, center_y))
+            tile.priority = self.stock_weight * tile.stock_hits + self.rate_weight * tile.stock_rate + proximity
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+'''
+# on-disk hospital metadata cache (sqlite)
+ - orgName, address, phoneNumber, openHour, coordinates keyed by orgCode
+ - written when a hospital is first seen or its metadata changes, not on every search
+ - hospitals still returned by searches get updated_at refreshed at most once per touch_interval, so eviction by age only drops hospitals that stopped showing up
+ - schema version in PRAGMA user_version, old schema is dropped and rebuilt
+ - eviction by age and by entry count
+'''
+
+import json
+import logging
+import sqlite3
+import time
+
+SCHEMA_VERSION = 1
+METADATA_FIELDS = ('orgName', 'address', 'phoneNumber', 'openHour', 'x', 'y')
+
+
+class hospital_cache:
+    def __init__(self, path='hospital-cache.sqlite3', max_entries=5000, max_age_days=30, touch_interval=86400.0,
+                 clock=time.time):
+        self.path = path or ':memory:'
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.touch_interval = touch_interval
+        self._clock = clock
+        self._connection = None
+        self._rows = {}  # orgCode -> metadata dict (lazy)
+        self._known = {}  # orgCode -> updated_at
+        self._signatures = {}  # orgCode -> 마지막으로 확인한 검색 결과의 METADATA_FIELDS 값
+
+    def open(self):
+        if self._connection is not None:
+            return self
+        try:
+            self._connection = sqlite3.connect(self.path)
+        except sqlite3.Error as error:
+            logging.warning("hospital cache open error : %s" % error)
+            self._connection = sqlite3.connect(':memory:')
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self.__migrate()
+        self.evict()
+        self._known = dict(self._connection.execute("SELECT org_code, updated_at FROM hospitals"))
+        return self
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __migrate(self):
+        version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self._connection.execute("DROP TABLE IF EXISTS hospitals")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS hospitals ("
+            " org_code TEXT PRIMARY KEY, metadata TEXT NOT NULL, updated_at REAL NOT NULL)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS hospitals_updated_at ON hospitals (updated_at)")
+        self._connection.execute("PRAGMA user_version = %d" % SCHEMA_VERSION)
+        self._connection.commit()
+
+    def evict(self):
+        expire_before = self._clock() - self.max_age_days * 86400
+        self._connection.execute("DELETE FROM hospitals WHERE updated_at < ?", (expire_before,))
+        self._connection.execute(
+            "DELETE FROM hospitals WHERE org_code NOT IN"
+            " (SELECT org_code FROM hospitals ORDER BY updated_at DESC LIMIT ?)", (self.max_entries,))
+        self._connection.commit()
+
+    def learn(self, organizations):
+        """ 처음 보거나 정보가 바뀐 병원만 저장하고, 계속 검색되는 병원은 touch_interval 마다 updated_at 만 갱신합니다. """
+        now = self._clock()
+        known = self._known
+        changed = []
+        touched = []
+        for org in organizations:
+            org_code = org.get('orgCode')
+            updated_at = known.get(org_code)
+            if updated_at is None or self.__changed(org_code, org):
+                changed.append(org)
+            elif now - updated_at >= self.touch_interval:
+                touched.append(org_code)
+        if changed:
+            self.put_many(changed)
+        if touched:
+            self.touch(touched)
+
+    def __changed(self, org_code, org):
+        signature = tuple(org.get(field) for field in METADATA_FIELDS)
+        if self._signatures.get(org_code) == signature:
+            return False
+        metadata = self.get(org_code) or {}
+        self._signatures[org_code] = signature
+        return any(value is not None and value != metadata.get(field)
+                   for field, value in zip(METADATA_FIELDS, signature))
+
+    def touch(self, org_codes):
+        now = self._clock()
+        for org_code in org_codes:
+            self._known[org_code] = now
+        if self._connection is not None:
+            self._connection.executemany("UPDATE hospitals SET updated_at = ? WHERE org_code = ?",
+                                         [(now, org_code) for org_code in org_codes])
+            self._connection.commit()
+
+    def put(self, org):
+        if org:
+            self.put_many([org])
+
+    def put_many(self, organizations):
+        now = self._clock()
+        rows = []
+        for org in organizations:
+            org_code = org.get('orgCode')
+            if org_code is None:
+                continue
+            metadata = dict(self.get(org_code) or {})
+            metadata.update({field: org[field] for field in METADATA_FIELDS if org.get(field) is not None})
+            self._rows[org_code] = metadata
+            self._known[org_code] = now
+            rows.append((org_code, json.dumps(metadata, ensure_ascii=False), now))
+        if rows and self._connection is not None:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO hospitals (org_code, metadata, updated_at) VALUES (?, ?, ?)", rows)
+            self._connection.commit()
+
+    def get(self, org_code):
+        metadata = self._rows.get(org_code)
+        if metadata is None and self._connection is not None and org_code in self._known:
+            row = self._connection.execute("SELECT metadata FROM hospitals WHERE org_code = ?",
+                                           (org_code,)).fetchone()
+            if row is not None:
+                metadata = self._rows[org_code] = json.loads(row[0])
+        return metadata
+
+    def name(self, org_code):
+        metadata = self.get(org_code)
+        return metadata.get('orgName') if metadata else org_code
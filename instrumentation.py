@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+'''
+# hot path instrumentation
+ - perf_counter_ns timing spans (dns, connect, request, json decode, candidate filter, reservation attempt)
+ - rolling histogram per span : fixed buckets for prometheus + recent window for percentiles
+ - periodic export to a json-lines file and/or a local prometheus text endpoint
+'''
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+
+import aiohttp
+
+# 히스토그램 구간 상한. 단위: ms
+BUCKET_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class rolling_histogram:
+    def __init__(self, window=1024):
+        self.bucket_counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ns = 0
+        self._recent = deque(maxlen=window)
+
+    def add(self, elapsed_ns):
+        elapsed_ms = elapsed_ns / 1e6
+        index = 0
+        for bound in BUCKET_BOUNDS_MS:
+            if elapsed_ms <= bound:
+                break
+            index += 1
+        self.bucket_counts[index] += 1
+        self.count += 1
+        self.total_ns += elapsed_ns
+        self._recent.append(elapsed_ns)
+
+    def percentile(self, rank):
+        if not self._recent:
+            return None
+        ordered = sorted(self._recent)
+        return ordered[min(len(ordered) - 1, int(rank / 100.0 * len(ordered)))]
+
+    def snapshot(self):
+        def ms(value):
+            return None if value is None else round(value / 1e6, 3)
+
+        return {"count": self.count,
+                "mean_ms": ms(self.total_ns / self.count) if self.count else None,
+                "p50_ms": ms(self.percentile(50)),
+                "p95_ms": ms(self.percentile(95)),
+                "p99_ms": ms(self.percentile(99)),
+                "max_ms": ms(max(self._recent)) if self._recent else None}
+
+
+class _span:
+    __slots__ = ('_metrics', '_name', '_start')
+
+    def __init__(self, metrics, name):
+        self._metrics = metrics
+        self._name = name
+        self._start = 0
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._metrics.record(self._name, time.perf_counter_ns() - self._start)
+        return False
+
+
+class _null_span:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _null_span()
+
+
+class hot_path_metrics:
+    def __init__(self, enabled=True, window=1024):
+        self.enabled = enabled
+        self._window = window
+        self.histograms = {}
+
+    def span(self, name):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _span(self, name)
+
+    def record(self, name, elapsed_ns):
+        if not self.enabled:
+            return
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = rolling_histogram(self._window)
+        histogram.add(elapsed_ns)
+
+    def snapshot(self):
+        return {name: histogram.snapshot() for name, histogram in sorted(self.histograms.items())}
+
+    def trace_config(self):
+        """ aiohttp 요청의 dns 조회, 커넥션 생성 시간을 기록합니다. (커넥션 풀 재사용 시에는 기록되지 않습니다.) """
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_dns_start(session, context, params):
+            context.dns_start = time.perf_counter_ns()
+
+        async def on_dns_end(session, context, params):
+            self.record('http.dns', time.perf_counter_ns() - context.dns_start)
+
+        async def on_connect_start(session, context, params):
+            context.connect_start = time.perf_counter_ns()
+
+        async def on_connect_end(session, context, params):
+            self.record('http.connect', time.perf_counter_ns() - context.connect_start)
+
+        trace_config.on_dns_resolvehost_start.append(on_dns_start)
+        trace_config.on_dns_resolvehost_end.append(on_dns_end)
+        trace_config.on_connection_create_start.append(on_connect_start)
+        trace_config.on_connection_create_end.append(on_connect_end)
+        return trace_config
+
+    def prometheus_text(self):
+        lines = []
+        for name, histogram in sorted(self.histograms.items()):
+            metric = 'vaccine_span_seconds'
+            cumulative = 0
+            for bound, count in zip(BUCKET_BOUNDS_MS + ('+Inf',), histogram.bucket_counts):
+                cumulative += count
+                le = bound if bound == '+Inf' else repr(bound / 1000.0)
+                lines.append('%s_bucket{span="%s",le="%s"} %d' % (metric, name, le, cumulative))
+            lines.append('%s_sum{span="%s"} %.9f' % (metric, name, histogram.total_ns / 1e9))
+            lines.append('%s_count{span="%s"} %d' % (metric, name, histogram.count))
+        if lines:
+            lines.insert(0, '# TYPE vaccine_span_seconds histogram')
+        return '\n'.join(lines) + '\n'
+
+
+class metrics_exporter:
+    def __init__(self, metrics, file_path=None, port=0, interval=10.0, host='127.0.0.1'):
+        self._metrics = metrics
+        self._file_path = file_path
+        self._port = port
+        self._host = host
+        self._interval = interval
+        self._task = None
+        self._runner = None
+
+    async def start(self):
+        if self._file_path:
+            self._task = asyncio.ensure_future(self._export_loop())
+        if self._port:
+            from aiohttp import web
+            app = web.Application()
+            app.router.add_get('/metrics', self._handle_metrics)
+            self._runner = web.AppRunner(app, access_log=None)
+            await self._runner.setup()
+            await web.TCPSite(self._runner, self._host, self._port).start()
+        return self
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            self.export()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def export(self):
+        record = {"time": time.time(), "spans": self._metrics.snapshot()}
+        try:
+            with open(self._file_path, 'a', encoding='utf-8') as metrics_file:
+                metrics_file.write(json.dumps(record) + '\n')
+        except OSError as error:
+            logging.warning("metrics export error : %s" % error)
+
+    async def _export_loop(self):
+        while True:
+            await asyncio.sleep(self._interval)
+            self.export()
+
+    async def _handle_metrics(self, request):
+        from aiohttp import web
+        return web.Response(text=self._metrics.prometheus_text(), content_type='text/plain')
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+'''
+# fast json decoding
+ - decode straight from response bytes with orjson / ujson when installed, stdlib json otherwise
+ - project each organization into a compact __slots__ record with only the fields the loop uses
+   (orgName, address, ... are kept in hospital_cache, not in the record)
+'''
+
+import json
+
+_DECODERS = {'json': json.loads}
+
+try:
+    import orjson
+    _DECODERS['orjson'] = orjson.loads
+except ImportError:
+    pass
+
+try:
+    import ujson
+    _DECODERS['ujson'] = ujson.loads
+except ImportError:
+    pass
+
+_decoder_name = next(name for name in ('orjson', 'ujson', 'json') if name in _DECODERS)
+_loads = _DECODERS[_decoder_name]
+
+
+def loads(body):
+    return _loads(body)
+
+
+def decoder_name():
+    return _decoder_name
+
+
+def set_decoder(name):
+    """ 사용할 디코더를 지정합니다. (json, orjson, ujson) 설치되지 않은 디코더면 ValueError """
+    global _decoder_name, _loads
+    if name not in _DECODERS:
+        raise ValueError("json decoder not available : %s" % name)
+    _decoder_name = name
+    _loads = _DECODERS[name]
+
+
+class org_record:
+    # left_count_by_coords 응답의 병원 정보 중 조회/예약에 필요한 값만 보관합니다.
+    __slots__ = ('orgCode', 'status', 'leftCounts', 'x', 'y')
+
+    def __init__(self, orgCode=None, status=None, leftCounts=None, x=None, y=None):
+        self.orgCode = orgCode
+        self.status = status
+        self.leftCounts = leftCounts
+        self.x = x
+        self.y = y
+
+    @classmethod
+    def from_dict(cls, org):
+        get = org.get
+        return cls(get('orgCode'), get('status'), get('leftCounts'), get('x'), get('y'))
+
+    # 기존 dict 와 같은 방식(org.get('status'), org['orgCode'])으로도 사용할 수 있습니다.
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def as_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __repr__(self):
+        return repr(self.as_dict())
+
+
+def project_organizations(organizations):
+    if organizations is None:
+        return None
+    from_dict = org_record.from_dict
+    return [from_dict(org) for org in organizations]
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+'''
+# shared async http transport
+ - one aiohttp ClientSession / TCPConnector for the whole process
+ - keep-alive connection pool reused by vaccine search, reservation and user info
+ - dns cache, so every cycle skips name resolution and tls handshake
+ - 429 / 5xx responses raise kakao_http_error with the server's Retry-After, 401 / 403 raise kakao_auth_error
+ - optional recorder gets every response (or timeout / connection error) for later replay (traffic_replay.py)
+'''
+
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+
+import aiohttp
+
+import json_decoder
+from instrumentation import hot_path_metrics
+
+
+def parse_retry_after(value):
+    """ Retry-After 헤더(초 또는 HTTP-date)를 초 단위로 변환합니다. """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class kakao_http_error(aiohttp.ClientError):
+    def __init__(self, status, retry_after=None):
+        super().__init__("http status %d" % status)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class kakao_auth_error(kakao_http_error):
+    pass
+
+
+class kakao_http_client:
+    def __init__(self, pool_limit=32, pool_limit_per_host=16, keepalive_timeout=30, dns_cache_ttl=300,
+                 default_timeout=5, metrics=None, recorder=None):
+        self._pool_limit = pool_limit
+        self._pool_limit_per_host = pool_limit_per_host
+        self._keepalive_timeout = keepalive_timeout
+        self._dns_cache_ttl = dns_cache_ttl
+        self._default_timeout = aiohttp.ClientTimeout(total=default_timeout)
+        self._session = None
+        self.metrics = metrics or hot_path_metrics(enabled=False)
+        self.recorder = recorder
+
+    @staticmethod
+    def timeout(total=None, connect=None, read=None):
+        # connect: 커넥션 풀 대기 + tcp/tls 연결, read: 소켓 읽기 간격, total: 요청 전체
+        return aiohttp.ClientTimeout(total=total, connect=connect, sock_read=read)
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self._pool_limit,
+                                             limit_per_host=self._pool_limit_per_host,
+                                             keepalive_timeout=self._keepalive_timeout,
+                                             ttl_dns_cache=self._dns_cache_ttl,
+                                             ssl=False)
+            # 쿠키는 요청마다 직접 넘기므로 세션 쿠키 저장소는 사용하지 않습니다.
+            trace_configs = [self.metrics.trace_config()] if self.metrics.enabled else None
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self._default_timeout,
+                                                  cookie_jar=aiohttp.DummyCookieJar(),
+                                                  trace_configs=trace_configs)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def post_json(self, url, data, headers, cookies=None, timeout=None, span=None):
+        return self.decode(await self.post_bytes(url, data, headers, cookies, timeout, span), span)
+
+    async def post_bytes(self, url, data, headers, cookies=None, timeout=None, span=None):
+        """ 상태 코드만 확인하고 응답 본문을 bytes 그대로 돌려줍니다. (디코딩은 조회 파이프라인의 decode 단계에서) """
+        session = await self.open()
+        with self.metrics.span((span or 'http') + '.request'):
+            try:
+                async with session.post(url, data=data, headers=headers, cookies=cookies,
+                                        timeout=timeout or self._default_timeout) as response:
+                    body = await response.read()
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as error:
+                if self.recorder is not None:
+                    self.recorder.record_error(span, data, error)
+                raise
+        retry_after = response.headers.get('Retry-After')
+        if self.recorder is not None:
+            self.recorder.record(span, data, response.status, body, retry_after)
+        self._check_status(response.status, retry_after)
+        return body
+
+    async def get_json(self, url, headers, cookies=None, timeout=None, span=None):
+        session = await self.open()
+        with self.metrics.span((span or 'http') + '.request'):
+            async with session.get(url, headers=headers, cookies=cookies,
+                                   timeout=timeout or self._default_timeout) as response:
+                body = await response.read()
+        self._check_status(response.status, response.headers.get('Retry-After'))
+        return self.decode(body, span)
+
+    @staticmethod
+    def _check_status(status, retry_after=None):
+        # 로그인 세션이 만료된 경우
+        if status == 401 or status == 403:
+            raise kakao_auth_error(status)
+        # 요청이 몰리거나 서버 장애인 경우. 그 외의 에러 응답은 본문(json)을 그대로 돌려줍니다.
+        if status == 429 or status >= 500:
+            raise kakao_http_error(status, parse_retry_after(retry_after))
+
+    def decode(self, body, span=None):
+        with self.metrics.span((span or 'http') + '.decode'):
+            return json_decoder.loads(body)
@@ -0,0 +1,311 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+# local mock of the kakao vaccine api (offline test, benchmark)
+ - POST /api/v2/vaccine/left_count_by_coords
+ - POST /api/v1/reservation
+ - GET  /api/v1/user
+ - scripted scenario : stock appearing / vanishing, latency + jitter, timeouts, error payloads, login session expiry
+
+# usage
+ python mock_kakao_server.py --port 8080 --scenario scenario.json
+ KAKAO_VACCINE_MAP_URL=http://127.0.0.1:8080 KAKAO_VACCINE_URL=http://127.0.0.1:8080 python vaccine-run-kakao-refac.py
+
+# scenario.json
+ {
+   "hospitals": [{"orgCode": "A1", "orgName": "...", "x": 126.9, "y": 37.5, "leftCounts": 0}],
+   "random_hospitals": 0,
+   "area": [126.83, 37.47, 126.92, 37.54],
+   "events": [{"at": 3.0, "orgCode": "A1", "leftCounts": 2}, {"at": 6.0, "orgCode": "A1", "leftCounts": 0},
+              {"at": 8.0, "session": "token-2"}],
+   "session_cookie": {"name": "_kawlt", "value": "token-1"},
+   "user": {"name": "홍길동", "status": "NORMAL"},
+   "search": {"latency": 0.02, "jitter": 0.01, "timeout_rate": 0.0, "error_rate": 0.0, "error_status": 429, "retry_after": 1},
+   "reservation": {"latency": 0.05, "jitter": 0.02, "code": null},
+   "user_api": {"error_rate": 0.0}
+ }
+'''
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from aiohttp import web
+
+FAILURE_DESC = {
+    "NO_VACANCY": "잔여백신 접종 신청이 선착순 마감되었습니다.",
+    "TIMEOUT": "접종 신청 시간이 초과되었습니다.",
+    "ALREADY_RESERVED": "이미 접종이 완료되었거나 예약이 완료된 사용자입니다.",
+}
+
+
+class mock_endpoint_behavior:
+    def __init__(self, latency=0.0, jitter=0.0, timeout_rate=0.0, timeout_delay=30.0, error_rate=0.0,
+                 error_status=500, retry_after=None, code=None):
+        self.latency = latency  # 기본 응답 지연. 단위: 초
+        self.jitter = jitter  # 0 ~ jitter 사이의 추가 지연. 단위: 초
+        self.timeout_rate = timeout_rate  # timeout_delay 만큼 응답하지 않을 확률
+        self.timeout_delay = timeout_delay
+        self.error_rate = error_rate  # 에러 응답을 보낼 확률
+        self.error_status = error_status  # 에러 응답의 http status (429, 500, 503, ...)
+        self.retry_after = retry_after  # 에러 응답에 붙일 Retry-After 헤더. 단위: 초
+        self.code = code  # 예약 응답 코드 강제 지정 (SUCCESS, NO_VACANCY, ...)
+
+    @classmethod
+    def from_dict(cls, values):
+        return cls(**(values or {}))
+
+    async def delay(self, rng):
+        if self.timeout_rate and rng.random() < self.timeout_rate:
+            await asyncio.sleep(self.timeout_delay)
+        wait = self.latency + (rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def is_error(self, rng):
+        return bool(self.error_rate) and rng.random() < self.error_rate
+
+    def error_response(self):
+        headers = {"Retry-After": str(self.retry_after)} if self.retry_after is not None else None
+        return web.json_response({"error": "error occurred"}, status=self.error_status, headers=headers)
+
+
+def generate_hospitals(count, area, seed=0):
+    """ area: (left longitude, bottom latitude, right longitude, top latitude) 안에 임의의 병원을 만듭니다. """
+    rng = random.Random(seed)
+    min_x, min_y, max_x, max_y = area
+    hospitals = []
+    for index in range(count):
+        hospitals.append({
+            "orgCode": "MOCK%05d" % index,
+            "orgName": "모의병원 %d" % index,
+            "address": "서울특별시 모의구 모의로 %d" % index,
+            "phoneNumber": "02-000-%04d" % index,
+            "openHour": {"openHour": "09:00", "closeHour": "18:00"},
+            "x": rng.uniform(min_x, max_x),
+            "y": rng.uniform(min_y, max_y),
+            "leftCounts": 0,
+        })
+    return hospitals
+
+
+class mock_scenario:
+    def __init__(self, hospitals=None, events=None, user=None, search=None, reservation=None, user_api=None,
+                 session_cookie=None, seed=0):
+        self.hospitals = hospitals or []
+        self.events = sorted(events or [], key=lambda event: event["at"])
+        self.user = user or {"name": "홍길동", "status": "NORMAL"}
+        self.search = mock_endpoint_behavior.from_dict(search)
+        self.reservation = mock_endpoint_behavior.from_dict(reservation)
+        self.user_api = mock_endpoint_behavior.from_dict(user_api)
+        # 설정하면 /api/v1/user, /api/v1/reservation 은 이 쿠키가 있어야 응답합니다. (없거나 다르면 401)
+        self.session_cookie = session_cookie
+        self.seed = seed
+
+    @classmethod
+    def from_dict(cls, values):
+        hospitals = list(values.get("hospitals", []))
+        if values.get("random_hospitals"):
+            area = values.get("area", (126.83, 37.47, 126.92, 37.54))
+            hospitals += generate_hospitals(values["random_hospitals"], area, values.get("seed", 0))
+        return cls(hospitals=hospitals, events=values.get("events"), user=values.get("user"),
+                   search=values.get("search"), reservation=values.get("reservation"),
+                   user_api=values.get("user_api"), session_cookie=values.get("session_cookie"),
+                   seed=values.get("seed", 0))
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding="utf-8") as scenario_file:
+            return cls.from_dict(json.load(scenario_file))
+
+
+class mock_kakao_server:
+    def __init__(self, scenario=None, host="127.0.0.1", port=0):
+        self.scenario = scenario or mock_scenario()
+        self.host = host
+        self.port = port
+        self._rng = random.Random(self.scenario.seed)
+        self._hospitals = {hospital["orgCode"]: dict(hospital) for hospital in self.scenario.hospitals}
+        self._runner = None
+        self._event_handles = []
+        self.started_at = None
+        self.session = dict(self.scenario.session_cookie) if self.scenario.session_cookie else None
+
+        # 벤치마크에서 사용하는 기록 (perf_counter 기준)
+        self.stock_log = []  # (time, orgCode, leftCounts)
+        self.reservation_log = []  # (time, orgCode, code)
+        self.search_count = 0
+
+        self.app = web.Application()
+        self.app.router.add_post("/api/v2/vaccine/left_count_by_coords", self._left_count_by_coords)
+        self.app.router.add_post("/api/v1/reservation", self._reservation)
+        self.app.router.add_get("/api/v1/user", self._user)
+
+    @property
+    def base_url(self):
+        return "http://%s:%d" % (self.host, self.port)
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+        self.started_at = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        for event in self.scenario.events:
+            self._event_handles.append(loop.call_later(event["at"], self._apply_event, event))
+        return self
+
+    async def stop(self):
+        for handle in self._event_handles:
+            handle.cancel()
+        self._event_handles.clear()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    def set_stock(self, org_code, left_counts):
+        hospital = self._hospitals.get(org_code)
+        if hospital is None:
+            return
+        hospital["leftCounts"] = left_counts
+        self.stock_log.append((time.perf_counter(), org_code, left_counts))
+
+    def expire_session(self, value):
+        """ 로그인 세션을 바꿉니다. 이전 쿠키로 보낸 요청은 401 을 받습니다. """
+        if self.session is not None:
+            self.session["value"] = value
+
+    def _apply_event(self, event):
+        if "session" in event:
+            self.expire_session(event["session"])
+        else:
+            self.set_stock(event["orgCode"], event["leftCounts"])
+
+    def _is_authorized(self, request):
+        if self.session is None:
+            return True
+        return request.cookies.get(self.session["name"]) == self.session["value"]
+
+    def get_stock(self, org_code):
+        return self._hospitals[org_code]["leftCounts"]
+
+    def hospital_codes(self):
+        return list(self._hospitals)
+
+    @staticmethod
+    def _status(hospital):
+        if hospital.get("status"):
+            return hospital["status"]
+        return "AVAILABLE" if hospital["leftCounts"] > 0 else "EXHAUSTED"
+
+    async def _left_count_by_coords(self, request):
+        behavior = self.scenario.search
+        await behavior.delay(self._rng)
+        self.search_count += 1
+        if behavior.is_error(self._rng):
+            return behavior.error_response()
+
+        body = await request.json()
+        min_x = min(float(body["topLeft"]["x"]), float(body["bottomRight"]["x"]))
+        max_x = max(float(body["topLeft"]["x"]), float(body["bottomRight"]["x"]))
+        min_y = min(float(body["topLeft"]["y"]), float(body["bottomRight"]["y"]))
+        max_y = max(float(body["topLeft"]["y"]), float(body["bottomRight"]["y"]))
+        only_left = body.get("onlyLeft", False)
+
+        organizations = []
+        for hospital in self._hospitals.values():
+            if not (min_x <= hospital["x"] <= max_x and min_y <= hospital["y"] <= max_y):
+                continue
+            if only_left and hospital["leftCounts"] <= 0:
+                continue
+            organizations.append({
+                "orgCode": hospital["orgCode"],
+                "orgName": hospital.get("orgName", ""),
+                "address": hospital.get("address", ""),
+                "x": hospital["x"],
+                "y": hospital["y"],
+                "status": self._status(hospital),
+                "leftCounts": hospital["leftCounts"],
+            })
+        if body.get("order") == "latitude":
+            organizations.sort(key=lambda org: org["y"])
+        return web.json_response({"organizations": organizations})
+
+    async def _reservation(self, request):
+        received_at = time.perf_counter()
+        behavior = self.scenario.reservation
+        body = await request.json()
+        org_code = body.get("orgCode")
+        hospital = self._hospitals.get(org_code)
+
+        await behavior.delay(self._rng)
+        if not self._is_authorized(request):
+            self.reservation_log.append((received_at, org_code, "UNAUTHORIZED"))
+            return web.json_response({"error": "error occurred"}, status=401)
+        if behavior.is_error(self._rng):
+            self.reservation_log.append((received_at, org_code, "ERROR"))
+            return behavior.error_response()
+
+        code = behavior.code
+        if code is None:
+            code = "SUCCESS" if hospital is not None and hospital["leftCounts"] > 0 else "NO_VACANCY"
+        self.reservation_log.append((received_at, org_code, code))
+
+        if code != "SUCCESS":
+            return web.json_response({"code": code, "desc": FAILURE_DESC.get(code, code)})
+
+        if hospital is not None and hospital["leftCounts"] > 0:
+            self.set_stock(org_code, hospital["leftCounts"] - 1)
+        organization = dict(hospital or {"orgCode": org_code})
+        return web.json_response({"code": code, "desc": "", "organization": organization})
+
+    async def _user(self, request):
+        behavior = self.scenario.user_api
+        await behavior.delay(self._rng)
+        if not self._is_authorized(request) or behavior.is_error(self._rng):
+            return web.json_response({"error": "error occurred"}, status=401)
+        return web.json_response({"user": self.scenario.user})
+
+
+async def serve(scenario, host, port):
+    async with mock_kakao_server(scenario, host, port) as server:
+        print("모의 서버를 시작합니다. %s" % server.base_url)
+        while True:
+            await asyncio.sleep(3600)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="kakao vaccine api mock server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--scenario", help="scenario json file")
+    parser.add_argument("--hospitals", type=int, default=0, help="number of random hospitals to add")
+    args = parser.parse_args()
+
+    values = {}
+    if args.scenario:
+        with open(args.scenario, encoding="utf-8") as scenario_file:
+            values = json.load(scenario_file)
+    if args.hospitals:
+        values["random_hospitals"] = args.hospitals
+
+    try:
+        asyncio.run(serve(mock_scenario.from_dict(values), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+# ===================================== run ===================================== #
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+'''
+# non-blocking notification dispatcher
+ - the reservation path only puts an event on a bounded queue, delivery happens on a background worker thread
+ - full queue drops the oldest pending event, a failing or slow sink never reaches the booking path
+ - pluggable sinks : sound (playsound), console, desktop (plyer / windows toast via powershell / osascript /
+   notify-send, rejected at config load when none is available), file (json-lines),
+   webhook (json POST, for a local test receiver)
+ - config : notifications = sound, desktop, file:notifications.jsonl, webhook:http://127.0.0.1:9000/hook
+'''
+
+import importlib.util
+import json
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+RESERVED = 'reserved'
+RESERVATION_FAILED = 'reservation_failed'
+SESSION_EXPIRED = 'session_expired'
+SEARCH_PAUSED = 'search_paused'
+
+_STOP = object()
+
+
+class notification_event:
+    __slots__ = ('kind', 'title', 'message', 'data', 'time')
+
+    def __init__(self, kind, title, message="", data=None):
+        self.kind = kind
+        self.title = title
+        self.message = message
+        self.data = data or {}
+        self.time = time.time()
+
+    def as_dict(self):
+        return {"kind": self.kind, "title": self.title, "message": self.message, "data": self.data,
+                "time": self.time}
+
+
+class notification_sink:
+    kinds = None  # 전달할 이벤트 종류 (None 이면 전체)
+
+    def accepts(self, event):
+        return self.kinds is None or event.kind in self.kinds
+
+    def send(self, event):
+        raise NotImplementedError
+
+
+class sound_sink(notification_sink):
+    kinds = (RESERVED,)
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, event):
+        # 시작 시간을 줄이기 위해 playsound 는 실제로 재생할 때 불러옵니다.
+        from playsound import playsound
+        playsound(self.path)
+
+
+class console_sink(notification_sink):
+    def send(self, event):
+        print("[%s] %s %s" % (event.kind, event.title, event.message))
+
+
+# 제목, 내용은 환경변수로 넘겨 PowerShell 문자열 escape 를 하지 않습니다.
+_WINDOWS_TOAST = """
+[Windows.UI.Notifications.ToastNotificationManager, Windows.UI.Notifications, ContentType = WindowsRuntime] > $null
+$template = [Windows.UI.Notifications.ToastNotificationManager]::GetTemplateContent(
+    [Windows.UI.Notifications.ToastTemplateType]::ToastText02)
+$texts = $template.GetElementsByTagName('text')
+$texts.Item(0).AppendChild($template.CreateTextNode($env:VACCINE_NOTIFY_TITLE)) > $null
+$texts.Item(1).AppendChild($template.CreateTextNode($env:VACCINE_NOTIFY_MESSAGE)) > $null
+$toast = [Windows.UI.Notifications.ToastNotification]::new($template)
+[Windows.UI.Notifications.ToastNotificationManager]::CreateToastNotifier($env:VACCINE_NOTIFY_APP_ID).Show($toast)
+"""
+# 등록된 AppUserModelID 가 있어야 알림이 보이므로 Windows PowerShell 의 ID 를 사용합니다.
+_WINDOWS_APP_ID = r'{1AC14E77-02E7-4E5D-B744-2EB1AE5198B7}\WindowsPowerShell\v1.0\powershell.exe'
+
+
+class desktop_sink(notification_sink):
+    kinds = (RESERVED, SESSION_EXPIRED)
+
+    @staticmethod
+    def backend():
+        """ 사용할 수 있는 데스크톱 알림 방법. 없으면 None """
+        if importlib.util.find_spec('plyer') is not None:
+            return 'plyer'
+        if sys.platform == 'win32':
+            return 'powershell' if shutil.which('powershell') else None
+        if sys.platform == 'darwin':
+            return 'osascript' if shutil.which('osascript') else None
+        return 'notify-send' if shutil.which('notify-send') else None
+
+    def __init__(self):
+        self._backend = self.backend()
+
+    def send(self, event):
+        if self._backend == 'plyer':
+            from plyer import notification
+            notification.notify(title=event.title, message=event.message, timeout=10)
+        elif self._backend == 'powershell':
+            env = dict(os.environ, VACCINE_NOTIFY_TITLE=str(event.title), VACCINE_NOTIFY_MESSAGE=str(event.message),
+                       VACCINE_NOTIFY_APP_ID=_WINDOWS_APP_ID)
+            subprocess.run(['powershell', '-NoProfile', '-NonInteractive', '-Command', _WINDOWS_TOAST], env=env,
+                           check=True, timeout=10, creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+        elif self._backend == 'osascript':
+            subprocess.run(['osascript', '-e', 'display notification %s with title %s' % (
+                _applescript_string(event.message), _applescript_string(event.title))], check=True, timeout=10)
+        elif self._backend == 'notify-send':
+            subprocess.run(['notify-send', event.title, event.message], check=True, timeout=10)
+
+
+def _applescript_string(text):
+    # AppleScript 문자열은 \ 와 " 만 escape 합니다. (json 의 \uXXXX 는 그대로 보이므로 한글을 escape 하지 않습니다.)
+    return '"%s"' % str(text).replace('\\', '\\\\').replace('"', '\\"')
+
+
+class file_sink(notification_sink):
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, event):
+        with open(self.path, 'a', encoding='utf-8') as notification_file:
+            notification_file.write(json.dumps(event.as_dict(), ensure_ascii=False, default=str) + '\n')
+
+
+class webhook_sink(notification_sink):
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, event):
+        request = urllib.request.Request(self.url,
+                                         data=json.dumps(event.as_dict(), ensure_ascii=False,
+                                                         default=str).encode('utf-8'),
+                                         headers={"Content-Type": "application/json"}, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+def build_sinks(spec, sound_path=None):
+    """ 'sound, desktop, file:path, webhook:url' 형식의 설정으로 sink 목록을 만듭니다. """
+    sinks = []
+    for item in (spec or "").split(','):
+        name, _, argument = item.strip().partition(':')
+        name = name.lower()
+        if not name:
+            continue
+        if name == 'sound':
+            if sound_path:
+                sinks.append(sound_sink(sound_path))
+        elif name == 'console':
+            sinks.append(console_sink())
+        elif name == 'desktop':
+            if desktop_sink.backend() is None:
+                raise ValueError("desktop notification is not available on this system (install plyer)")
+            sinks.append(desktop_sink())
+        elif name == 'file':
+            sinks.append(file_sink(argument or 'notifications.jsonl'))
+        elif name == 'webhook' and argument:
+            sinks.append(webhook_sink(argument))
+        else:
+            raise ValueError("unknown notification sink : %s" % item.strip())
+    return sinks
+
+
+class notification_dispatcher:
+    def __init__(self, sinks=(), max_queue=64):
+        self.sinks = list(sinks)
+        self._queue = queue.Queue(maxsize=max(1, max_queue))
+        self._thread = None
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def start(self):
+        if self.sinks and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='notification', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=10.0):
+        """ 남은 알림을 timeout 초까지 전달하고 종료합니다. (예약 성공 알림음이 끝까지 재생되도록) """
+        if self._thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            # 종료 요청 때문에 남은 알림(예약 성공 등)이 버려지지 않도록 큐에 자리가 날 때까지 기다립니다.
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logging.warning("notification queue still full, %d pending notifications dropped", self._queue.qsize())
+        self._thread.join(max(0.0, deadline - time.monotonic()))
+        self._thread = None
+
+    def notify(self, kind, title, message="", **data):
+        """ 기다리지 않고 바로 반환합니다. """
+        if not self.sinks:
+            return
+        self._put(notification_event(kind, title, message, data))
+
+    def _put(self, item):
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                pass
+            # 가장 오래된 알림을 버리고 새 알림을 넣습니다.
+            try:
+                self._queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+
+    def _run(self):
+        while True:
+            event = self._queue.get()
+            if event is _STOP:
+                break
+            for sink in self.sinks:
+                if not sink.accepts(event):
+                    continue
+                try:
+                    sink.send(event)
+                    self.sent += 1
+                except Exception as error:
+                    self.failed += 1
+                    logging.warning("notification %s error : %s", type(sink).__name__, error)
+
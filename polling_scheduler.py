@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+'''
+# adaptive polling scheduler
+ - search interval moves between min_interval (floor) and max_interval (ceiling)
+ - slow responses (latency ewma over target) and a high error rate stretch the interval
+ - failures back off exponentially with full jitter, 429/503 Retry-After is respected up to the ceiling
+'''
+
+import random
+from collections import deque
+
+
+class adaptive_polling_scheduler:
+    def __init__(self, min_interval=0.1, max_interval=5.0, target_latency=0.5, error_window=20, smoothing=0.2,
+                 rng=None):
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.target_latency = target_latency  # 이 응답 시간을 넘으면 비례해서 주기를 늘립니다. 단위: 초
+        self.smoothing = smoothing  # 응답 시간 지수이동평균 계수
+        self._rng = rng or random.Random()
+        self._latency = None
+        self._results = deque(maxlen=error_window)
+        self._consecutive_failures = 0
+        self._retry_after = 0.0
+
+    def on_success(self, latency):
+        if self._latency is None:
+            self._latency = latency
+        else:
+            self._latency += self.smoothing * (latency - self._latency)
+        self._results.append(True)
+        self._consecutive_failures = 0
+        self._retry_after = 0.0
+
+    def on_failure(self, retry_after=None):
+        self._results.append(False)
+        self._consecutive_failures += 1
+        self._retry_after = retry_after or 0.0
+
+    def error_rate(self):
+        if not self._results:
+            return 0.0
+        return self._results.count(False) / len(self._results)
+
+    def latency(self):
+        return self._latency
+
+    def next_interval(self):
+        if self._consecutive_failures:
+            cap = min(self.max_interval, self.min_interval * 2 ** self._consecutive_failures)
+            interval = self._rng.uniform(self.min_interval, cap)
+        else:
+            interval = self.min_interval
+            if self._latency is not None and self._latency > self.target_latency:
+                interval *= self._latency / self.target_latency
+            interval *= 1 + 4 * self.error_rate()
+        interval = max(interval, self._retry_after)
+        return min(max(interval, self.min_interval), self.max_interval)
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+'''
+# pre-serialized request templates
+ - search bodies are encoded once per tile when the config is loaded, every cycle reuses the same bytes
+ - reservation body is split around orgCode at config load, an attempt only joins prefix + orgCode + suffix
+ - reservation headers carry the Cookie header built once per cookie jar (rebuilt when the session monitor swaps it),
+   so aiohttp does not build a temporary cookie jar for every request
+'''
+
+import json
+from json.encoder import encode_basestring_ascii
+
+_ORG_CODE_MARKER = "__ORG_CODE__"
+
+
+class request_templates:
+    def __init__(self, vaccine_type, search_headers, reservation_headers, tiles=()):
+        self.search_headers = dict(search_headers)
+        self._reservation_headers = dict(reservation_headers)
+        self._search_bodies = {tile.index: self.encode(tile.body()) for tile in tiles}
+
+        body = self.encode({"from": "Map", "vaccineCode": vaccine_type, "orgCode": _ORG_CODE_MARKER,
+                            "distance": "null"})
+        self._reservation_prefix, self._reservation_suffix = body.split(
+            encode_basestring_ascii(_ORG_CODE_MARKER).encode('ascii'))
+        self._cookie = None
+        self._cookie_headers = self._reservation_headers
+
+    @staticmethod
+    def encode(data):
+        return json.dumps(data).encode('utf-8')
+
+    def search_body(self, tile):
+        body = self._search_bodies.get(tile.index)
+        if body is None:
+            body = self._search_bodies[tile.index] = self.encode(tile.body())
+        return body
+
+    def reservation_body(self, org_code):
+        return b''.join((self._reservation_prefix, encode_basestring_ascii(org_code).encode('ascii'),
+                         self._reservation_suffix))
+
+    def reservation_headers(self, cookie):
+        """ cookie dict 가 바뀔 때만 Cookie 헤더를 다시 만듭니다. (쿠키 교체 시 dict 자체가 바뀝니다.) """
+        if cookie is not self._cookie:
+            headers = dict(self._reservation_headers)
+            if cookie:
+                headers["Cookie"] = "; ".join("%s=%s" % (name, value) for name, value in cookie.items())
+            self._cookie, self._cookie_headers = cookie, headers
+        return self._cookie_headers
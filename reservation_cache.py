@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+'''
+# negative cache and in-flight dedup for reservation attempts
+ - a failure code from the reservation api (NO_VACANCY, TIMEOUT, ...) blocks the same (orgCode, vaccine_type)
+   for a code specific time, no POST is sent while the entry is alive. ALREADY_RESERVED is about the user, not
+   the hospital : the caller stops searching instead (reservation_stopped)
+ - the block is lifted early when the hospital shows more leftCounts than when it failed (new stock)
+ - only one reservation request per hospital is outstanding at a time
+ - expired entries are returned by expire() so the caller can look at the hospital again
+'''
+
+import time
+
+# 실패 코드별 차단 시간. 단위: 초 (없는 코드는 default_ttl)
+FAILURE_TTL = {
+    'TIMEOUT': 1.0,  # 접종 신청 시간 초과. 서버 사정이므로 곧 다시 시도합니다.
+}
+
+
+class reservation_attempt_cache:
+    def __init__(self, vaccine_type, default_ttl=60.0, failure_ttl=None, clock=time.monotonic):
+        self.vaccine_type = vaccine_type
+        self.default_ttl = default_ttl  # NO_VACANCY 등 나머지 실패 코드의 차단 시간 (0 이면 사용하지 않음)
+        self.failure_ttl = dict(FAILURE_TTL, **(failure_ttl or {}))
+        self._clock = clock
+        self._failures = {}  # (orgCode, vaccine_type) -> (만료 시각, 실패 코드, 실패 당시 leftCounts)
+        self._in_flight = set()
+
+    def __len__(self):
+        return len(self._failures)
+
+    def _key(self, org_code):
+        return org_code, self.vaccine_type
+
+    def ttl(self, code):
+        if not self.default_ttl:
+            return 0.0
+        return self.failure_ttl.get(code, self.default_ttl)
+
+    def blocked(self, org):
+        """ 최근 실패한 병원이면 실패 코드를 반환합니다. 실패 당시보다 잔여백신이 늘었으면 None """
+        failure = self._failures.get(self._key(org.get('orgCode')))
+        if failure is None:
+            return None
+        expires_at, code, left_counts = failure
+        if self._clock() >= expires_at:
+            return None
+        if (org.get('leftCounts') or 0) > (left_counts or 0):
+            return None
+        return code
+
+    def record_failure(self, org_code, code, left_counts=None):
+        ttl = self.ttl(code)
+        if ttl > 0:
+            self._failures[self._key(org_code)] = (self._clock() + ttl, code, left_counts)
+
+    def record_success(self, org_code):
+        self._failures.pop(self._key(org_code), None)
+
+    def expire(self):
+        """ 차단 시간이 지난 병원의 orgCode 목록 """
+        now = self._clock()
+        expired = [key for key, (expires_at, _, _) in self._failures.items() if now >= expires_at]
+        for key in expired:
+            del self._failures[key]
+        return [org_code for org_code, _ in expired]
+
+    def begin(self, org_code):
+        """ 같은 병원에 진행중인 예약 요청이 있으면 False """
+        key = self._key(org_code)
+        if key in self._in_flight:
+            return False
+        self._in_flight.add(key)
+        return True
+
+    def end(self, org_code):
+        self._in_flight.discard(self._key(org_code))
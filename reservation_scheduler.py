@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+'''
+# reservation scheduler
+ - launch reservation attempts with a concurrency cap, shared by every run() in flight (reservation batches)
+ - first success wins, remaining in-flight attempts are cancelled
+ - an attempt raising reservation_stopped (e.g. the user is already reserved) cancels the rest and propagates
+'''
+
+import asyncio
+import logging
+
+
+class reservation_stopped(Exception):
+    """ 더 이상 어느 병원에도 예약을 시도할 필요가 없습니다. (이미 예약한 사용자 등) """
+
+    def __init__(self, code, desc=""):
+        super().__init__("%s %s" % (code, desc))
+        self.code = code
+        self.desc = desc
+
+
+class reservation_scheduler:
+    def __init__(self, concurrency_limit=4):
+        self.concurrency_limit = max(1, int(concurrency_limit))
+        # 여러 조회 결과를 동시에 예약하더라도(run 이 여러 개) 실제 요청 수는 concurrency_limit 을 넘지 않습니다.
+        self._slots = asyncio.Semaphore(self.concurrency_limit)
+        self.in_flight = 0
+
+    async def run(self, attempt, candidates):
+        """ attempt(org) 를 동시에 최대 concurrency_limit 개까지 실행하고, 처음 성공한 org 를 반환합니다. """
+        candidates = iter(candidates)
+        running = {}
+        try:
+            while True:
+                while len(running) < self.concurrency_limit:
+                    org = next(candidates, None)
+                    if org is None:
+                        break
+                    running[asyncio.ensure_future(self._attempt(attempt, org))] = org
+
+                if not running:
+                    return None
+
+                done, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    org = running.pop(task)
+                    if task.cancelled():
+                        continue
+                    error = task.exception()
+                    if isinstance(error, reservation_stopped):
+                        raise error
+                    if error is not None:
+                        logging.warning("reservation error %s : %r" % (org.get('orgCode'), error))
+                        continue
+                    if task.result():
+                        return org
+        finally:
+            await self._cancel(running)
+
+    async def _attempt(self, attempt, org):
+        async with self._slots:
+            self.in_flight += 1
+            try:
+                return await attempt(org)
+            finally:
+                self.in_flight -= 1
+
+    @staticmethod
+    async def _cancel(running):
+        if not running:
+            return
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        running.clear()
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+'''
+# retry engine with circuit breaker for the kakao api calls
+ - errors are classified : timeout, connect, server (429 / 5xx), malformed (json / payload), auth (401 / 403)
+ - bounded exponential backoff with jitter per error class, Retry-After is respected up to the class ceiling
+ - retry_if narrows the retried errors further, e.g. request_not_sent for requests that must not be sent twice
+ - circuit breaker : opens after consecutive failures, lets one probe through after the reset timeout (half open),
+   closes again on the first success. the reset timeout doubles while probes keep failing (bounded)
+ - unclassified exceptions (bugs) are not retried and propagate unchanged
+'''
+
+import asyncio
+import logging
+import random
+import time
+
+import aiohttp
+
+from kakao_http import kakao_auth_error, kakao_http_error
+
+TIMEOUT = 'timeout'
+CONNECT = 'connect'
+SERVER = 'server'
+MALFORMED = 'malformed'
+AUTH = 'auth'
+
+# 에러 종류별 (첫 대기 시간, 최대 대기 시간). 단위: 초
+DEFAULT_BACKOFF = {
+    TIMEOUT: (0.2, 2.0),
+    CONNECT: (0.5, 10.0),
+    SERVER: (1.0, 30.0),
+    MALFORMED: (0.5, 5.0),
+    AUTH: (5.0, 60.0),
+}
+
+
+def classify_error(error):
+    """ 재시도 대상 에러의 종류를 반환합니다. 분류할 수 없는 에러는 None """
+    if isinstance(error, asyncio.TimeoutError):
+        return TIMEOUT
+    if isinstance(error, kakao_auth_error):
+        return AUTH
+    if isinstance(error, kakao_http_error):
+        return SERVER
+    if isinstance(error, (aiohttp.ClientPayloadError, aiohttp.ContentTypeError, ValueError)):
+        return MALFORMED
+    if isinstance(error, aiohttp.ClientError):
+        return CONNECT
+    return None
+
+
+def request_not_sent(error):
+    """ 서버가 요청을 처리하지 않았다고 확실히 말할 수 있는 에러 (연결 실패, 429) """
+    if isinstance(error, kakao_http_error):
+        return error.status == 429
+    return isinstance(error, aiohttp.ClientConnectorError)
+
+
+class circuit_open_error(Exception):
+    def __init__(self, name, retry_in):
+        super().__init__("%s circuit open, retry in %.1f s" % (name, retry_in))
+        self.name = name
+        self.retry_in = retry_in
+
+
+class circuit_breaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=10.0, max_reset_timeout=60.0, clock=time.monotonic):
+        self.failure_threshold = max(1, int(failure_threshold))  # 연속 실패가 이 횟수가 되면 회로를 엽니다.
+        self.base_reset_timeout = reset_timeout  # 회로가 열린 뒤 다시 시도하기까지의 시간. 단위: 초
+        self.max_reset_timeout = max(max_reset_timeout, reset_timeout)
+        self._clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.reset_timeout = reset_timeout
+        self._opened_at = 0.0
+        self._probing = False
+        self.open_count = 0
+
+    def allow(self):
+        if self.state == self.OPEN:
+            if self._clock() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.HALF_OPEN:
+            # 반쯤 열린 동안에는 확인 요청 하나만 보냅니다.
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def retry_in(self):
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_timeout - self._clock())
+
+    def release(self):
+        """ 확인 요청이 성공, 실패를 판단할 수 없이 끝난 경우 다음 확인 요청을 허용합니다. """
+        self._probing = False
+
+    def on_success(self):
+        if self.state != self.CLOSED:
+            logging.info("circuit closed")
+        self.state = self.CLOSED
+        self.failures = 0
+        self.reset_timeout = self.base_reset_timeout
+        self._probing = False
+
+    def on_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN:
+            self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+            self._open()
+        elif self.state == self.CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self._opened_at = self._clock()
+        self._probing = False
+        self.open_count += 1
+        logging.warning("circuit open for %.1f s after %d failures", self.reset_timeout, self.failures)
+
+
+class retry_engine:
+    def __init__(self, name, max_attempts=1, retry_on=(TIMEOUT, CONNECT, SERVER, MALFORMED), backoff=None,
+                 breaker=None, rng=None, sleep=asyncio.sleep, retry_if=None):
+        self.name = name
+        self.max_attempts = max(1, int(max_attempts))  # 한 번의 call 에서 시도할 최대 횟수
+        self.retry_on = frozenset(retry_on)
+        self.retry_if = retry_if  # retry_on 중에서도 retry_if(error) 가 True 인 에러만 다시 시도합니다.
+        self.backoff = dict(DEFAULT_BACKOFF, **(backoff or {}))
+        self.breaker = breaker or circuit_breaker()
+        self._rng = rng or random.Random()
+        self._sleep = sleep
+        self._consecutive = {}
+        self.error_counts = {}
+
+    async def call(self, function, *args, **kwargs):
+        result = await self.attempt(function, *args, **kwargs)
+        self.on_success()
+        return result
+
+    async def attempt(self, function, *args, **kwargs):
+        """ call 과 같지만 성공 처리(on_success)는 호출하는 쪽이 응답 내용까지 확인한 뒤에 합니다. """
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise circuit_open_error(self.name, self.breaker.retry_in())
+            try:
+                result = await function(*args, **kwargs)
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as error:
+                kind = self.on_failure(error)
+                attempt += 1
+                if kind is None or kind not in self.retry_on or attempt >= self.max_attempts:
+                    raise
+                if self.retry_if is not None and not self.retry_if(error):
+                    raise
+                await self._sleep(self.delay(kind, getattr(error, 'retry_after', None)))
+                continue
+            return result
+
+    def on_success(self):
+        self._consecutive.clear()
+        self.breaker.on_success()
+
+    def on_failure(self, error):
+        kind = classify_error(error)
+        if kind is None:
+            self.breaker.release()
+            return None
+        self._consecutive[kind] = self._consecutive.get(kind, 0) + 1
+        self.error_counts[kind] = self.error_counts.get(kind, 0) + 1
+        # 인증 실패는 서버 장애가 아니므로 회로를 열지 않습니다. (세션 모니터가 처리)
+        if kind == AUTH:
+            self.breaker.release()
+        else:
+            self.breaker.on_failure()
+        return kind
+
+    def delay(self, kind, retry_after=None):
+        """ 같은 종류의 연속 실패 횟수에 따라 늘어나는 대기 시간. 단위: 초 """
+        base, ceiling = self.backoff[kind]
+        failures = max(1, self._consecutive.get(kind, 1))
+        cap = min(ceiling, base * 2 ** (failures - 1))
+        delay = self._rng.uniform(base, cap) if cap > base else base
+        if retry_after:
+            delay = max(delay, min(retry_after, ceiling))
+        return delay
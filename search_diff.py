@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+'''
+# incremental change detection on search results
+ - per orgCode state table (status, leftCounts)
+ - each snapshot is diffed against the previous one, only transitions are passed on
+   (new hospital, EXHAUSTED -> AVAILABLE, leftCounts 0 -> N, ...)
+'''
+
+
+class org_transition:
+    __slots__ = ('org', 'previous_status', 'previous_left_counts')
+
+    def __init__(self, org, previous_status=None, previous_left_counts=None):
+        self.org = org
+        self.previous_status = previous_status
+        self.previous_left_counts = previous_left_counts
+
+    @property
+    def is_new(self):
+        return self.previous_status is None and self.previous_left_counts is None
+
+    def __repr__(self):
+        return "org_transition(%s %s/%s -> %s/%s)" % (self.org.get('orgCode'),
+                                                      self.previous_status, self.previous_left_counts,
+                                                      self.org.get('status'), self.org.get('leftCounts'))
+
+
+class org_state_table:
+    def __init__(self):
+        self._states = {}  # orgCode -> (status, leftCounts)
+
+    def __len__(self):
+        return len(self._states)
+
+    def update(self, organizations, complete=True):
+        """ 이전 조회 결과와 비교해서 상태가 바뀐 병원만 반환합니다.
+        complete 이면 응답에서 빠진 병원을 상태표에서 지우고, 일부 영역만 조회한 경우(False)에는 유지합니다. """
+        previous_states = self._states
+        states = {} if complete else previous_states
+        transitions = []
+        for org in organizations:
+            org_code = org.get('orgCode')
+            state = (org.get('status'), org.get('leftCounts'))
+            previous = previous_states.get(org_code)
+            states[org_code] = state
+            if previous != state:
+                if previous is None:
+                    transitions.append(org_transition(org))
+                else:
+                    transitions.append(org_transition(org, previous[0], previous[1]))
+        self._states = states
+        return transitions
+
+    def snapshot(self):
+        return {org_code: list(state) for org_code, state in self._states.items()}
+
+    def restore(self, snapshot):
+        for org_code, (status, left_counts) in (snapshot or {}).items():
+            self._states[org_code] = (status, left_counts)
+
+    def forget(self, org_code):
+        """ 다음 조회에서 해당 병원이 다시 변경분으로 나오도록 상태를 지웁니다. (예약 요청 실패 시 재시도용) """
+        self._states.pop(org_code, None)
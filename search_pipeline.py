@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+'''
+# staged search pipeline
+ - fetch -> decode -> diff/filter -> rank -> reserve, report. the fetch loop is the producer, every other stage is
+   a set of worker tasks reading from its own bounded asyncio.Queue
+ - a full queue makes the upstream stage wait (backpressure), back up to the fetch loop which then searches less often
+ - overflow = 'drop_oldest' stages never hold back upstream : the oldest pending item is discarded (on_drop callback)
+ - per stage metrics : 'stage.<name>' handling time, 'stage.<name>.wait' time spent in the queue,
+   processed / dropped counts and the deepest queue seen (stats)
+ - a stage without outputs that returns a value finishes the pipeline, an exception in any stage stops it.
+   when the source stops (e.g. end of a replayed recording), items already queued are processed first
+'''
+
+import asyncio
+import time
+
+from instrumentation import hot_path_metrics
+
+BLOCK = 'block'
+DROP_OLDEST = 'drop_oldest'
+
+
+class search_cycle:
+    # 한 번의 조회가 단계를 거치며 채워지는 값
+    __slots__ = ('tiles', 'start_ns', 'latency', 'interval', 'bodies', 'organizations', 'transitions', 'candidates')
+
+    def __init__(self, tiles, start_ns):
+        self.tiles = tiles
+        self.start_ns = start_ns
+        self.latency = 0.0
+        self.interval = 0.0
+        self.bodies = None
+        self.organizations = None
+        self.transitions = None
+        self.candidates = None
+
+
+class pipeline_stage:
+    def __init__(self, name, handler, concurrency=1, queue_size=2, overflow=BLOCK, accepts=None, on_drop=None):
+        self.name = name
+        self.handler = handler  # async handler(item) -> 다음 단계로 넘길 값 (None 이면 넘기지 않음)
+        self.concurrency = max(1, int(concurrency))  # 동시에 처리할 항목 수
+        self.overflow = overflow  # 큐가 가득 찼을 때 : block (앞 단계가 기다림), drop_oldest (가장 오래된 항목을 버림)
+        self.accepts = accepts  # 이 단계로 넘길 항목인지 판단하는 함수 (None 이면 전부)
+        self.on_drop = on_drop
+        self.outputs = []
+        self.queue = asyncio.Queue(maxsize=max(1, int(queue_size)))
+        self.processed = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def then(self, *stages):
+        self.outputs.extend(stages)
+        return self
+
+    async def put(self, item):
+        if self.accepts is not None and not self.accepts(item):
+            return
+        if self.overflow == DROP_OLDEST:
+            while self.queue.full():
+                _, dropped = self.queue.get_nowait()
+                self.queue.task_done()
+                self.dropped += 1
+                if self.on_drop is not None:
+                    self.on_drop(dropped)
+            self.queue.put_nowait((time.perf_counter_ns(), item))
+        else:
+            await self.queue.put((time.perf_counter_ns(), item))
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    async def idle(self):
+        """ 큐에 있는 항목을 모두 처리할 때까지 기다립니다. """
+        await self.queue.join()
+
+    def stats(self):
+        return {"processed": self.processed, "dropped": self.dropped, "queued": self.queue.qsize(),
+                "max_depth": self.max_depth, "concurrency": self.concurrency}
+
+
+class search_pipeline:
+    def __init__(self, source, first_stage, stages, metrics=None):
+        self._source = source  # async source(emit) : 조회 루프. emit(item) 으로 첫 단계에 넘깁니다.
+        self._first_stage = first_stage
+        self.stages = list(stages)
+        self._metrics = metrics or hot_path_metrics(enabled=False)
+        self._result = None
+
+    async def run(self):
+        """ 마지막 단계가 값을 돌려주면 그 값을 반환하고, 어느 단계에서든 예외가 나면 그 예외를 전파합니다. """
+        self._result = asyncio.get_running_loop().create_future()
+        tasks = [asyncio.ensure_future(self._guard(self._produce()))]
+        for stage in self.stages:
+            tasks.extend(asyncio.ensure_future(self._guard(self._worker(stage))) for _ in range(stage.concurrency))
+        try:
+            return await self._result
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self):
+        return {stage.name: stage.stats() for stage in self.stages}
+
+    def _finish(self, result=None, error=None):
+        if self._result.done():
+            return
+        if error is not None:
+            self._result.set_exception(error)
+        else:
+            self._result.set_result(result)
+
+    async def _produce(self):
+        try:
+            await self._source(self._first_stage.put)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            await self._drain()
+            self._finish(error=error)
+            return
+        await self._drain()
+        self._finish()
+
+    async def _drain(self):
+        # 단계 순서대로 큐가 빌 때까지 기다립니다. (앞 단계 항목은 다음 단계로 넘긴 뒤에 처리 완료됩니다.)
+        for stage in self.stages:
+            await stage.idle()
+
+    async def _guard(self, coroutine):
+        try:
+            await coroutine
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            self._finish(error=error)
+
+    async def _worker(self, stage):
+        span_name = 'stage.' + stage.name
+        wait_name = span_name + '.wait'
+        while True:
+            queued_at, item = await stage.queue.get()
+            start = time.perf_counter_ns()
+            self._metrics.record(wait_name, start - queued_at)
+            try:
+                output = await stage.handler(item)
+                self._metrics.record(span_name, time.perf_counter_ns() - start)
+                stage.processed += 1
+                if output is None:
+                    continue
+                if not stage.outputs:
+                    self._finish(output)
+                    return
+                for downstream in stage.outputs:
+                    await downstream.put(output)
+            finally:
+                stage.queue.task_done()
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+'''
+# checkpoint for the headless service mode
+ - periodically and on shutdown, the search state (stats, ranking history, tile stock history, last snapshot)
+   is written to a json file (temporary file + rename, never half written)
+ - on restart the state is loaded back so the run resumes warm. hospital metadata is already kept in hospital_cache
+'''
+
+import asyncio
+import json
+import logging
+import os
+
+CHECKPOINT_FORMAT = 1
+
+
+class service_checkpoint:
+    def __init__(self, path='service-checkpoint.json', interval=60.0):
+        self.path = path
+        self.interval = interval  # 저장 주기. 단위: 초 (0 이면 종료할 때만 저장)
+        self._task = None
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as checkpoint_file:
+                state = json.load(checkpoint_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as error:
+            logging.warning("checkpoint load error : %s", error)
+            return None
+        if state.get("format") != CHECKPOINT_FORMAT:
+            return None
+        return state
+
+    def save(self, state):
+        state = dict(state, format=CHECKPOINT_FORMAT)
+        temporary_path = self.path + '.tmp'
+        try:
+            with open(temporary_path, 'w', encoding='utf-8') as checkpoint_file:
+                json.dump(state, checkpoint_file, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temporary_path, self.path)
+        except OSError as error:
+            logging.warning("checkpoint save error : %s", error)
+            return False
+        return True
+
+    def start(self, collect):
+        """ collect() 가 돌려주는 상태를 interval 마다 저장합니다. """
+        if self.interval > 0:
+            self._task = asyncio.ensure_future(self._save_loop(collect))
+        return self
+
+    async def stop(self, collect):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.save(collect())
+
+    async def _save_loop(self, collect):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.save(collect())
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+'''
+# kakao login session health monitor
+ - background task re-validates /api/v1/user on the shared connection pool every interval seconds
+ - auth failures seen in reservation responses wake the monitor immediately
+ - on an expired session the .kakao.com cookies are re-read from chrome and hot-swapped, the polling loop keeps running
+'''
+
+import asyncio
+import logging
+import time
+
+import aiohttp
+
+from notification import SESSION_EXPIRED
+
+
+class session_health_monitor:
+    def __init__(self, user_info, interval=300.0, retry_interval=10.0, display=None, notifier=None):
+        self._user_info = user_info
+        self.interval = interval  # 정상일 때 세션 확인 주기. 단위: 초
+        self.retry_interval = retry_interval  # 세션이 만료된 동안 쿠키를 다시 불러오는 주기. 단위: 초
+        self._display = display
+        self._notifier = notifier
+        self._wake = asyncio.Event()
+        self._task = None
+        self.healthy = True
+        self.last_checked = None
+        self.refresh_count = 0
+        self.auth_failure_count = 0
+
+    def start(self):
+        if self.interval > 0:
+            self._task = asyncio.ensure_future(self._monitor_loop())
+        return self
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def report_auth_failure(self):
+        """ 예약 응답에서 인증 실패를 확인했을 때 호출합니다. 기다리지 않고 바로 반환합니다. """
+        self.auth_failure_count += 1
+        self.healthy = False
+        self._wake.set()
+
+    async def _monitor_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(),
+                                       timeout=self.interval if self.healthy else self.retry_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.check()
+
+    async def check(self):
+        self.last_checked = time.time()
+        try:
+            if await self._user_info.validate():
+                self.healthy = True
+                return True
+            self._message("로그인 세션이 만료되었습니다. Chrome 에서 쿠키를 다시 불러옵니다.")
+            refreshed = await self._user_info.refresh()
+        except (asyncio.TimeoutError, aiohttp.ClientError) as error:
+            # 네트워크 에러는 세션 만료가 아니므로 다음 확인에서 다시 시도합니다.
+            logging.warning("session check error : %s", error)
+            return self.healthy
+        except Exception as error:
+            logging.warning("cookie reload error : %s", error)
+            refreshed = False
+
+        self.healthy = refreshed
+        if refreshed:
+            self.refresh_count += 1
+            logging.info("session refreshed")
+            self._message("쿠키를 다시 불러와 로그인 세션을 복구했습니다.")
+        else:
+            logging.warning("session expired")
+            if self._notifier is not None:
+                self._notifier.notify(SESSION_EXPIRED, "로그인 세션 만료", "Chrome 브라우저에서 카카오에 다시 로그인해주세요.")
+            self._message("Chrome 브라우저에서 카카오에 다시 로그인해주세요. %s 초 후 다시 확인합니다." % self.retry_interval)
+        return refreshed
+
+    def _message(self, text):
+        if self._display is not None:
+            self._display.message(text)
+        else:
+            print(text)
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+'''
+# history of stock appearances and the polling schedule built from it
+ - every stock appearance (orgCode, time, coordinates, leftCounts) and every hour the search was running are
+   appended to a compact binary file (35 bytes per record, no per-record numpy import on the search path)
+ - profile() aggregates the file with numpy : per hour of day (and per tile x hour) probability that stock appears,
+   counted once per observed hour slot and smoothed toward the overall rate
+ - the schedule polls at search_interval in the busiest hours and stretches toward search_interval_quiet in hours
+   where stock rarely appeared, hot tiles follow the hour's profile
+ - nothing changes until min_days of history have been observed
+'''
+
+import logging
+import os
+import struct
+import time
+
+HISTORY_MAGIC = b'STOCKH01'
+APPEARED = 0
+OBSERVED = 1
+
+# 기록 형식 : 시각(unix time), orgCode, x, y, leftCounts, 종류 (little endian, 정렬 없음)
+_RECORD = struct.Struct('<d16sffHB')
+_DTYPE = [('time', '<f8'), ('org', 'S16'), ('x', '<f4'), ('y', '<f4'), ('left', '<u2'), ('kind', 'u1')]
+
+
+def hour_of_day(timestamp):
+    return time.localtime(timestamp).tm_hour
+
+
+class stock_history:
+    def __init__(self, path='stock-history.bin', flush_interval=10.0, clock=time.time):
+        self.path = path  # 없으면 기록하지 않습니다.
+        self.flush_interval = flush_interval  # 파일에 쓰는 주기. 단위: 초
+        self._clock = clock
+        self._pending = []
+        self._last_flush = 0.0
+        self._observed_slot = None
+        self.record_count = 0
+
+    def record(self, org):
+        """ 잔여백신이 새로 보인 병원을 기록합니다. """
+        if not self.path:
+            return
+        try:
+            x, y = float(org.get('x')), float(org.get('y'))
+        except (TypeError, ValueError):
+            x = y = float('nan')
+        org_code = str(org.get('orgCode') or '').encode('utf-8')[:16]
+        left_counts = min(max(int(org.get('leftCounts') or 0), 0), 0xFFFF)
+        self._pending.append(_RECORD.pack(self._clock(), org_code, x, y, left_counts, APPEARED))
+        self.observe()
+
+    def observe(self):
+        """ 조회가 진행중인 시간대를 기록합니다. (한 시간에 한 번) 확률 계산의 분모가 됩니다. """
+        if not self.path:
+            return
+        now = self._clock()
+        slot = int(now // 3600)
+        if slot != self._observed_slot:
+            self._observed_slot = slot
+            self._pending.append(_RECORD.pack(now, b'', 0.0, 0.0, 0, OBSERVED))
+        if now - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = self._clock()
+        if not self._pending or not self.path:
+            return
+        records, self._pending = self._pending, []
+        try:
+            new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            with open(self.path, 'ab') as history_file:
+                if new_file:
+                    history_file.write(HISTORY_MAGIC)
+                history_file.write(b''.join(records))
+            self.record_count += len(records)
+        except OSError as error:
+            logging.warning("stock history write error : %s", error)
+
+    def load(self):
+        """ 저장된 기록을 numpy 구조체 배열로 읽습니다. 파일이 없거나 형식이 다르면 빈 배열 """
+        import numpy as np
+        dtype = np.dtype(_DTYPE)
+        try:
+            with open(self.path, 'rb') as history_file:
+                data = history_file.read()
+        except OSError:
+            return np.zeros(0, dtype=dtype)
+        if not data.startswith(HISTORY_MAGIC):
+            if data:
+                logging.warning("stock history format mismatch : %s", self.path)
+            return np.zeros(0, dtype=dtype)
+        body = data[len(HISTORY_MAGIC):]
+        # 쓰다가 끊긴 마지막 기록은 버립니다.
+        return np.frombuffer(body[:len(body) - len(body) % dtype.itemsize], dtype=dtype)
+
+    def current_hour(self):
+        return hour_of_day(self._clock())
+
+    def profile(self, tile_grid=None, min_days=3, smoothing=2.0):
+        """ 파일에 쓴 기록으로 확률을 계산합니다. (남은 기록은 먼저 flush 해 주세요) """
+        if not self.path:
+            return None
+        return appearance_profile.build(self.load(), tile_grid, min_days, smoothing)
+
+
+class appearance_profile:
+    def __init__(self, hourly, tiles=None, days=0):
+        self.hourly = hourly  # 시간대(0 ~ 23)별 잔여백신이 나타날 확률
+        self.tiles = tiles  # (타일 수, 24) 타일, 시간대별 확률
+        self.days = days  # 기록이 있는 날 수
+
+    @classmethod
+    def build(cls, records, tile_grid=None, min_days=3, smoothing=2.0):
+        """ tile_grid : (min_x, min_y, max_x, max_y, rows, cols). 기록이 min_days 보다 적으면 None """
+        import numpy as np
+        if not len(records):
+            return None
+        # 현지 시각 기준 시간 (한 시간 단위 slot 번호)
+        offset = time.localtime(float(records['time'][-1])).tm_gmtoff
+        slots = ((records['time'] + offset) // 3600).astype(np.int64)
+        appeared = records['kind'] == APPEARED
+
+        observed_slots = np.unique(slots[records['kind'] == OBSERVED])
+        days = len(np.unique(observed_slots // 24))
+        if days < min_days:
+            return None
+        observed = np.bincount(observed_slots % 24, minlength=24).astype(np.float64)
+
+        # 같은 시간에 여러 번 나와도 한 번으로 셉니다.
+        hit_slots = np.intersect1d(np.unique(slots[appeared]), observed_slots)
+        hits = np.bincount(hit_slots % 24, minlength=24).astype(np.float64)
+        overall = hits.sum() / max(observed.sum(), 1.0)
+        hourly = (hits + smoothing * overall) / (observed + smoothing)
+
+        tiles = None
+        if tile_grid is not None:
+            tiles = cls._tile_profile(records[appeared], slots[appeared], observed, tile_grid, smoothing)
+        return cls(hourly, tiles, days)
+
+    @staticmethod
+    def _tile_profile(records, slots, observed, tile_grid, smoothing):
+        import numpy as np
+        min_x, min_y, max_x, max_y, rows, cols = tile_grid
+        tile_count = rows * cols
+        width = (max_x - min_x) / cols or 1.0
+        height = (max_y - min_y) / rows or 1.0
+        x = records['x'].astype(np.float64)
+        y = records['y'].astype(np.float64)
+        inside = (x >= min_x) & (x <= max_x) & (y >= min_y) & (y <= max_y)
+        cols_index = np.minimum(((x[inside] - min_x) // width).astype(np.int64), cols - 1)
+        rows_index = np.minimum(((y[inside] - min_y) // height).astype(np.int64), rows - 1)
+        tile = rows_index * cols + cols_index
+
+        keys = np.unique(slots[inside] * tile_count + tile)
+        tile_hour = (keys % tile_count) * 24 + (keys // tile_count) % 24
+        hits = np.bincount(tile_hour, minlength=tile_count * 24).reshape(tile_count, 24).astype(np.float64)
+        overall = hits.sum(axis=1, keepdims=True) / max(observed.sum(), 1.0)
+        return (hits + smoothing * overall) / (observed + smoothing)
+
+    def interval(self, hour, busy_interval, quiet_interval):
+        """ 확률이 가장 높은 시간대는 busy_interval, 낮을수록 quiet_interval 에 가까운 조회 주기 """
+        peak = float(self.hourly.max())
+        if peak <= 0 or quiet_interval <= busy_interval:
+            return busy_interval
+        rate = float(self.hourly[hour]) / peak
+        return quiet_interval - (quiet_interval - busy_interval) * rate
+
+    def tile_rates(self, hour):
+        """ 해당 시간대의 타일별 확률 (가장 높은 타일이 1) """
+        if self.tiles is None:
+            return None
+        rates = self.tiles[:, hour]
+        peak = float(rates.max())
+        if peak <= 0:
+            return None
+        return [float(rate) / peak for rate in rates]
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+import pytest
+
+# 저장소 최상위 모듈과 benchmarks/common.py 를 테스트에서 불러올 수 있도록 합니다.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+class fake_clock:
+    """ clock 인자로 넘기는 시계. advance() 로만 시간이 흐릅니다. """
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return fake_clock()
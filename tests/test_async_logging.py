@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+'''
+# search cycle log sampling
+ - unchanged search cycles are sampled, cycles with transitions or candidates are always logged
+'''
+
+import asyncio
+import logging
+import types
+
+from async_logging import sampling_filter
+from benchmarks.common import load_vaccine_module
+from search_pipeline import search_cycle
+
+
+class record_collector(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class quiet_display:
+    def update(self, **summary):
+        pass
+
+    def changes(self, transitions):
+        pass
+
+
+def make_cycle(changed):
+    org = {'orgCode': 'ORG00001', 'leftCounts': 1}
+    cycle = search_cycle(['tile'], 0)
+    cycle.organizations = [org]
+    cycle.transitions = [types.SimpleNamespace(org=org)] if changed else []
+    cycle.candidates = [org] if changed else []
+    return cycle
+
+
+def report_cycles(cycles, every):
+    vaccine = load_vaccine_module()
+    reservation = types.SimpleNamespace(_display=quiet_display(), _tile_planner=types.SimpleNamespace(tiles=['tile']))
+    collector = record_collector()
+    collector.addFilter(sampling_filter(every))
+    root = logging.getLogger()
+    previous_level = root.level
+    root.addHandler(collector)
+    root.setLevel(logging.INFO)
+    try:
+        for cycle in cycles:
+            asyncio.run(vaccine.vaccine_reservation._report_stage(reservation, cycle))
+    finally:
+        root.removeHandler(collector)
+        root.setLevel(previous_level)
+    return [record for record in collector.records if record.getMessage().startswith('search ')]
+
+
+def test_changed_cycles_are_always_logged():
+    records = report_cycles([make_cycle(changed=True) for _ in range(250)], every=100)
+    assert len(records) == 250
+    assert all(getattr(record, 'sample_rate', None) is None for record in records)
+
+
+def test_unchanged_cycles_are_sampled():
+    records = report_cycles([make_cycle(changed=False) for _ in range(250)], every=100)
+    assert len(records) == 3
+    assert all(record.sample_rate == 100 for record in records)
+
+
+def test_changed_cycle_between_unchanged_cycles_is_logged():
+    cycles = [make_cycle(changed=False) for _ in range(50)] + [make_cycle(changed=True)]
+    records = report_cycles(cycles, every=100)
+    assert [record.getMessage().split(', ')[1] for record in records] == ['0 changed', '1 changed']
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+'''
+# hospital metadata cache : rewrite on change, touch of hospitals still searched, eviction by age
+'''
+
+import sqlite3
+
+from hospital_cache import hospital_cache
+
+
+def org(org_code='A', org_name='서울병원', address='서울 중구'):
+    return {'orgCode': org_code, 'orgName': org_name, 'address': address, 'leftCounts': 1}
+
+
+def updated_at(path, org_code):
+    with sqlite3.connect(path) as connection:
+        row = connection.execute("SELECT updated_at FROM hospitals WHERE org_code = ?", (org_code,)).fetchone()
+    return row and row[0]
+
+
+def test_changed_metadata_is_rewritten(tmp_path, clock):
+    path = str(tmp_path / 'hospitals.sqlite3')
+    cache = hospital_cache(path, clock=clock).open()
+    cache.learn([org()])
+    cache.learn([org(address='서울 중구 을지로')])
+    cache.close()
+
+    reopened = hospital_cache(path, clock=clock).open()
+    assert reopened.get('A')['address'] == '서울 중구 을지로'
+    assert reopened.name('A') == '서울병원'
+
+
+def test_hospitals_still_searched_survive_eviction(tmp_path, clock):
+    path = str(tmp_path / 'hospitals.sqlite3')
+    cache = hospital_cache(path, max_age_days=30, clock=clock).open()
+    cache.learn([org('A'), org('B')])
+    for _ in range(40):
+        clock.advance(86400)
+        cache.learn([org('A')])
+    cache.close()
+
+    reopened = hospital_cache(path, max_age_days=30, clock=clock).open()
+    assert reopened.get('A') is not None
+    assert reopened.get('B') is None
+
+
+def test_unchanged_hospitals_are_touched_at_most_once_per_interval(tmp_path, clock):
+    path = str(tmp_path / 'hospitals.sqlite3')
+    cache = hospital_cache(path, touch_interval=3600.0, clock=clock).open()
+    cache.learn([org()])
+    first = updated_at(path, 'A')
+    clock.advance(3599)
+    cache.learn([org()])
+    assert updated_at(path, 'A') == first
+    clock.advance(1)
+    cache.learn([org()])
+    assert updated_at(path, 'A') == first + 3600
+    cache.close()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+'''
+# notification dispatcher and sinks
+'''
+
+import threading
+import time
+
+import pytest
+
+import notification
+from notification import RESERVED, build_sinks, desktop_sink, notification_dispatcher, notification_sink
+
+
+class blocking_sink(notification_sink):
+    def __init__(self):
+        self.release = threading.Event()
+        self.titles = []
+
+    def send(self, event):
+        self.release.wait(5)
+        self.titles.append(event.title)
+
+
+def test_stop_delivers_pending_events_on_a_full_queue():
+    sink = blocking_sink()
+    dispatcher = notification_dispatcher([sink], max_queue=2).start()
+    dispatcher.notify(RESERVED, 'first')
+    while dispatcher._queue.qsize():
+        time.sleep(0.01)  # first 는 worker 가 전달중
+    dispatcher.notify(RESERVED, 'second')
+    dispatcher.notify(RESERVED, 'reserved')
+    threading.Timer(0.1, sink.release.set).start()
+    dispatcher.stop(timeout=5)
+    assert sink.titles == ['first', 'second', 'reserved']
+    assert dispatcher.dropped == 0
+
+
+def test_desktop_is_rejected_without_a_backend(monkeypatch):
+    monkeypatch.setattr(desktop_sink, 'backend', staticmethod(lambda: None))
+    with pytest.raises(ValueError):
+        build_sinks('sound, desktop', 'tada.mp3')
+
+
+def test_windows_toast_passes_text_through_the_environment(monkeypatch):
+    calls = []
+    monkeypatch.setattr(desktop_sink, 'backend', staticmethod(lambda: 'powershell'))
+    monkeypatch.setattr(notification.subprocess, 'run', lambda args, **kwargs: calls.append((args, kwargs)))
+    desktop_sink().send(notification.notification_event(RESERVED, '잔여백신 예약 완료', '"병원" 주소', {}))
+    args, kwargs = calls[0]
+    assert args[0] == 'powershell'
+    assert kwargs['env']['VACCINE_NOTIFY_TITLE'] == '잔여백신 예약 완료'
+    assert kwargs['env']['VACCINE_NOTIFY_MESSAGE'] == '"병원" 주소'
+
+
+def test_applescript_string_keeps_korean_text():
+    assert notification._applescript_string('예약 "완료" \\') == '"예약 \\"완료\\" \\\\"'
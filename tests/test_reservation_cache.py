@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+'''
+# negative cache expiry and in-flight dedup for reservation attempts
+'''
+
+from reservation_cache import reservation_attempt_cache
+
+
+def org(org_code='A', left_counts=1):
+    return {'orgCode': org_code, 'leftCounts': left_counts}
+
+
+def test_failure_blocks_until_ttl_expires(clock):
+    cache = reservation_attempt_cache('VEN00013', default_ttl=60.0, clock=clock)
+    cache.record_failure('A', 'NO_VACANCY', 1)
+    assert cache.blocked(org('A')) == 'NO_VACANCY'
+    assert cache.blocked(org('B')) is None
+    clock.advance(59.9)
+    assert cache.expire() == []
+    assert cache.blocked(org('A')) == 'NO_VACANCY'
+    clock.advance(0.1)
+    assert cache.blocked(org('A')) is None
+    assert cache.expire() == ['A']
+    assert len(cache) == 0
+
+
+def test_failure_ttl_depends_on_the_code(clock):
+    cache = reservation_attempt_cache('VEN00013', default_ttl=60.0, failure_ttl={'NO_VACANCY': 5.0}, clock=clock)
+    cache.record_failure('A', 'TIMEOUT', 1)
+    cache.record_failure('B', 'NO_VACANCY', 1)
+    cache.record_failure('C', 'OTHER', 1)
+    clock.advance(1.0)
+    assert cache.expire() == ['A']
+    clock.advance(4.0)
+    assert cache.expire() == ['B']
+    assert cache.blocked(org('C')) == 'OTHER'
+
+
+def test_more_stock_lifts_the_block(clock):
+    cache = reservation_attempt_cache('VEN00013', clock=clock)
+    cache.record_failure('A', 'NO_VACANCY', 2)
+    assert cache.blocked(org('A', 2)) == 'NO_VACANCY'
+    assert cache.blocked(org('A', 3)) is None
+
+
+def test_success_clears_and_zero_ttl_disables(clock):
+    cache = reservation_attempt_cache('VEN00013', clock=clock)
+    cache.record_failure('A', 'NO_VACANCY', 1)
+    cache.record_success('A')
+    assert cache.blocked(org('A')) is None
+
+    disabled = reservation_attempt_cache('VEN00013', default_ttl=0, clock=clock)
+    disabled.record_failure('A', 'NO_VACANCY', 1)
+    assert disabled.blocked(org('A')) is None and len(disabled) == 0
+
+
+def test_entries_are_per_vaccine_type(clock):
+    pfizer = reservation_attempt_cache('VEN00013', clock=clock)
+    moderna = reservation_attempt_cache('VEN00014', clock=clock)
+    pfizer.record_failure('A', 'NO_VACANCY', 1)
+    assert moderna.blocked(org('A')) is None
+
+
+def test_in_flight_dedup():
+    cache = reservation_attempt_cache('VEN00013')
+    assert cache.begin('A')
+    assert not cache.begin('A')
+    assert cache.begin('B')
+    cache.end('A')
+    assert cache.begin('A')
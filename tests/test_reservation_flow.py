@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+'''
+# vaccine_reservation against mock_kakao_server : which hospitals get a reservation request
+'''
+
+import asyncio
+
+from benchmarks.common import AREA, load_vaccine_module, offline_config, offline_user
+from mock_kakao_server import mock_kakao_server, mock_scenario
+from reservation_scheduler import reservation_stopped
+
+
+def run_reservations(scenario, config_values, seconds):
+    """ seconds 동안(또는 예약 성공까지) 조회, 예약을 실행하고 (모의 서버의 예약 기록, 조회를 멈춘 예외)를 반환합니다. """
+    vaccine = load_vaccine_module()
+
+    async def scenario_run():
+        async with mock_kakao_server(mock_scenario.from_dict(scenario)) as server:
+            vaccine.Endpoints.set_base_url(server.base_url, server.base_url)
+            async with vaccine.kakao_http_client() as http_client:
+                config = offline_config(vaccine, dict({"search_interval": 0.05}, **config_values))
+                reservation = vaccine.vaccine_reservation(offline_user(), http_client, config)
+                stopped = None
+                try:
+                    await asyncio.wait_for(reservation.find_vaccine(), seconds)
+                except asyncio.TimeoutError:
+                    pass
+                except reservation_stopped as error:
+                    stopped = error
+            return server.reservation_log, stopped
+
+    return asyncio.run(scenario_run())
+
+
+def stock_scenario(org_codes, code=None):
+    return {"random_hospitals": 20, "area": AREA, "seed": 1,
+            "events": [{"at": 0, "orgCode": org_code, "leftCounts": 2} for org_code in org_codes],
+            "reservation": {"code": code}}
+
+
+def test_candidates_beyond_top_n_are_tried_on_later_searches():
+    org_codes = ["MOCK%05d" % index for index in range(6)]
+    log, _ = run_reservations(stock_scenario(org_codes, code="NO_VACANCY"), {"reservation_top_n": 2}, 2.0)
+    assert {org_code for _, org_code, _ in log} == set(org_codes)
+
+
+def test_already_reserved_stops_the_search():
+    org_codes = ["MOCK%05d" % index for index in range(4)]
+    log, stopped = run_reservations(stock_scenario(org_codes, code="ALREADY_RESERVED"),
+                                    {"reservation_concurrency": 1, "reservation_batches": 1}, 3.0)
+    # 이미 예약된 사용자이므로 다른 병원에는 요청하지 않고 조회를 끝냅니다.
+    assert stopped is not None and stopped.code == "ALREADY_RESERVED"
+    assert len(log) == 1
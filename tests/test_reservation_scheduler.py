@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+'''
+# reservation scheduler : concurrency cap, first success wins, the rest is cancelled
+'''
+
+import asyncio
+
+from reservation_scheduler import reservation_scheduler
+
+
+class scripted_attempts:
+    """ orgCode 별로 (걸리는 시간, 결과)를 정해 둔 예약 시도 """
+
+    def __init__(self, script):
+        self.script = script
+        self.started = []
+        self.cancelled = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, org):
+        org_code = org['orgCode']
+        delay, result = self.script[org_code]
+        self.started.append(org_code)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(org_code)
+            raise
+        finally:
+            self.in_flight -= 1
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def orgs(*org_codes):
+    return [{'orgCode': org_code} for org_code in org_codes]
+
+
+def test_first_success_cancels_the_rest():
+    attempts = scripted_attempts({'A': (0.2, True), 'B': (0.01, True), 'C': (0.3, False)})
+    reserved = asyncio.run(reservation_scheduler(4).run(attempts, orgs('A', 'B', 'C')))
+    assert reserved['orgCode'] == 'B'
+    assert sorted(attempts.cancelled) == ['A', 'C']
+    assert attempts.in_flight == 0
+
+
+def test_concurrency_limit_is_respected():
+    attempts = scripted_attempts({code: (0.01, False) for code in 'ABCDEFG'})
+    reserved = asyncio.run(reservation_scheduler(3).run(attempts, orgs(*'ABCDEFG')))
+    assert reserved is None
+    assert attempts.started == list('ABCDEFG')
+    assert attempts.max_in_flight == 3
+
+
+def test_failed_attempt_does_not_stop_the_others():
+    attempts = scripted_attempts({'A': (0.01, ConnectionError('reset')), 'B': (0.02, False), 'C': (0.03, True)})
+    reserved = asyncio.run(reservation_scheduler(1).run(attempts, orgs('A', 'B', 'C')))
+    assert reserved['orgCode'] == 'C'
+    assert attempts.started == ['A', 'B', 'C']
+
+
+def test_cancelling_the_run_cancels_in_flight_attempts():
+    attempts = scripted_attempts({'A': (10, True), 'B': (10, True)})
+
+    async def cancel_run():
+        task = asyncio.ensure_future(reservation_scheduler(4).run(attempts, orgs('A', 'B')))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(cancel_run())
+    assert sorted(attempts.cancelled) == ['A', 'B']
+    assert attempts.in_flight == 0
+
+
+def test_concurrent_runs_share_the_limit():
+    attempts = scripted_attempts({code: (0.02, False) for code in 'ABCDEFGH'})
+    scheduler = reservation_scheduler(3)
+
+    async def two_batches():
+        return await asyncio.gather(scheduler.run(attempts, orgs(*'ABCD')), scheduler.run(attempts, orgs(*'EFGH')))
+
+    assert asyncio.run(two_batches()) == [None, None]
+    assert sorted(attempts.started) == list('ABCDEFGH')
+    assert attempts.max_in_flight == 3
+    assert scheduler.in_flight == 0
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+'''
+# circuit breaker state transitions and retry engine
+'''
+
+import asyncio
+import types
+
+import aiohttp
+import pytest
+
+from kakao_http import kakao_auth_error, kakao_http_error
+from retry_policy import (AUTH, CONNECT, MALFORMED, SERVER, TIMEOUT, circuit_breaker, circuit_open_error,
+                          classify_error, request_not_sent, retry_engine)
+
+
+def test_classify_error():
+    assert classify_error(asyncio.TimeoutError()) == TIMEOUT
+    assert classify_error(kakao_auth_error(401)) == AUTH
+    assert classify_error(kakao_http_error(503)) == SERVER
+    assert classify_error(ValueError("bad json")) == MALFORMED
+    assert classify_error(aiohttp.ClientConnectionError()) == CONNECT
+    assert classify_error(KeyError('bug')) is None
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = circuit_breaker(failure_threshold=3, reset_timeout=10.0, clock=clock)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.on_failure()
+    assert breaker.state == circuit_breaker.CLOSED
+    breaker.on_failure()
+    assert breaker.state == circuit_breaker.OPEN
+    assert not breaker.allow()
+    assert breaker.retry_in() == pytest.approx(10.0)
+
+
+def test_success_resets_failure_count(clock):
+    breaker = circuit_breaker(failure_threshold=2, clock=clock)
+    breaker.on_failure()
+    breaker.on_success()
+    breaker.on_failure()
+    assert breaker.state == circuit_breaker.CLOSED
+
+
+def test_half_open_allows_a_single_probe(clock):
+    breaker = circuit_breaker(failure_threshold=1, reset_timeout=10.0, clock=clock)
+    breaker.on_failure()
+    clock.advance(9.9)
+    assert not breaker.allow()
+    clock.advance(0.1)
+    assert breaker.allow()
+    assert breaker.state == circuit_breaker.HALF_OPEN
+    assert not breaker.allow()
+    # 결과를 알 수 없이 끝난 확인 요청(취소 등)은 다음 확인 요청을 막지 않습니다.
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_with_doubled_bounded_timeout(clock):
+    breaker = circuit_breaker(failure_threshold=1, reset_timeout=10.0, max_reset_timeout=30.0, clock=clock)
+    breaker.on_failure()
+    expected = (20.0, 30.0, 30.0)
+    for reset_timeout in expected:
+        clock.advance(breaker.reset_timeout)
+        assert breaker.allow()
+        breaker.on_failure()
+        assert breaker.state == circuit_breaker.OPEN
+        assert breaker.reset_timeout == reset_timeout
+    assert breaker.open_count == 4
+
+
+def test_successful_probe_closes_and_resets_timeout(clock):
+    breaker = circuit_breaker(failure_threshold=1, reset_timeout=10.0, clock=clock)
+    breaker.on_failure()
+    clock.advance(10.0)
+    assert breaker.allow()
+    breaker.on_failure()
+    clock.advance(20.0)
+    assert breaker.allow()
+    breaker.on_success()
+    assert breaker.state == circuit_breaker.CLOSED
+    assert breaker.reset_timeout == 10.0
+    assert breaker.allow() and breaker.allow()
+
+
+class failing_call:
+    def __init__(self, *errors, result='ok'):
+        self.errors = list(errors)
+        self.result = result
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.result
+
+
+def make_engine(clock, **kwargs):
+    sleeps = []
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+
+    kwargs.setdefault('breaker', circuit_breaker(failure_threshold=5, clock=clock))
+    return retry_engine('test', sleep=sleep, **kwargs), sleeps
+
+
+def test_retries_listed_kinds_with_backoff(clock):
+    engine, sleeps = make_engine(clock, max_attempts=3, retry_on=(SERVER,), backoff={SERVER: (0.1, 0.4)})
+    call = failing_call(kakao_http_error(503), kakao_http_error(502))
+    assert asyncio.run(engine.call(call)) == 'ok'
+    assert call.calls == 3
+    assert len(sleeps) == 2 and all(0.1 <= seconds <= 0.4 for seconds in sleeps)
+    assert engine.breaker.failures == 0
+
+
+def test_does_not_retry_other_kinds_or_bugs(clock):
+    engine, sleeps = make_engine(clock, max_attempts=3, retry_on=(CONNECT,))
+    call = failing_call(kakao_http_error(503))
+    with pytest.raises(kakao_http_error):
+        asyncio.run(engine.call(call))
+    assert call.calls == 1
+
+    call = failing_call(KeyError('bug'))
+    with pytest.raises(KeyError):
+        asyncio.run(engine.call(call))
+    assert call.calls == 1 and not sleeps
+
+
+def test_auth_failures_do_not_open_the_circuit(clock):
+    engine, _ = make_engine(clock, breaker=circuit_breaker(failure_threshold=1, clock=clock))
+    with pytest.raises(kakao_auth_error):
+        asyncio.run(engine.call(failing_call(kakao_auth_error(401))))
+    assert engine.breaker.state == circuit_breaker.CLOSED
+
+
+def test_open_circuit_rejects_calls_without_calling(clock):
+    engine, _ = make_engine(clock, breaker=circuit_breaker(failure_threshold=1, reset_timeout=5.0, clock=clock))
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(engine.call(failing_call(asyncio.TimeoutError())))
+    call = failing_call()
+    with pytest.raises(circuit_open_error) as raised:
+        asyncio.run(engine.call(call))
+    assert call.calls == 0 and raised.value.retry_in == pytest.approx(5.0)
+
+
+def test_retry_after_is_respected_up_to_the_ceiling(clock):
+    engine, _ = make_engine(clock, backoff={SERVER: (1.0, 30.0)})
+    engine.on_failure(kakao_http_error(503))
+    assert engine.delay(SERVER, retry_after=12) == 12
+    assert engine.delay(SERVER, retry_after=120) == 30.0
+
+
+def test_request_not_sent():
+    connection_key = types.SimpleNamespace(ssl=None, host='vaccine.kakao.com', port=443)
+    assert request_not_sent(aiohttp.ClientConnectorError(connection_key, OSError(111, 'refused')))
+    assert request_not_sent(kakao_http_error(429))
+    assert not request_not_sent(kakao_http_error(503))
+    assert not request_not_sent(aiohttp.ServerDisconnectedError())
+    assert not request_not_sent(asyncio.TimeoutError())
+
+
+def test_retry_if_limits_retries_to_unsent_requests(clock):
+    engine, _ = make_engine(clock, max_attempts=2, retry_on=(CONNECT, SERVER), retry_if=request_not_sent)
+    # 5xx, 연결 끊김은 서버가 이미 처리했을 수 있으므로 다시 보내지 않습니다.
+    for error in (kakao_http_error(503), aiohttp.ServerDisconnectedError()):
+        call = failing_call(error)
+        with pytest.raises(type(error)):
+            asyncio.run(engine.call(call))
+        assert call.calls == 1
+    call = failing_call(kakao_http_error(429, retry_after=0.1))
+    assert asyncio.run(engine.call(call)) == 'ok'
+    assert call.calls == 2
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+'''
+# staged search pipeline : drop_oldest / on_drop, accepts, backpressure, result and error propagation
+'''
+
+import asyncio
+
+import pytest
+
+from search_pipeline import DROP_OLDEST, pipeline_stage, search_pipeline
+
+
+def test_drop_oldest_discards_the_oldest_item_and_reports_it():
+    dropped = []
+    handled = []
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def source(emit):
+            await emit(0)
+            await asyncio.sleep(0)  # 0 은 worker 가 꺼내 처리중
+            for item in range(1, 5):
+                await emit(item)
+            release.set()
+
+        async def slow(item):
+            await release.wait()
+            handled.append(item)
+
+        stage = pipeline_stage('slow', slow, queue_size=2, overflow=DROP_OLDEST, on_drop=dropped.append)
+        await search_pipeline(source, stage, [stage]).run()
+        return stage
+
+    stage = asyncio.run(scenario())
+    assert dropped == [1, 2]
+    assert handled == [0, 3, 4]
+    assert stage.dropped == 2 and stage.processed == 3 and stage.max_depth == 2
+
+
+def test_accepts_filters_items():
+    handled = []
+
+    async def source(emit):
+        for item in range(5):
+            await emit(item)
+
+    async def collect(item):
+        handled.append(item)
+
+    async def forward(item):
+        return item
+
+    first = pipeline_stage('forward', forward)
+    even = pipeline_stage('even', collect, accepts=lambda item: item % 2 == 0)
+    first.then(even)
+    asyncio.run(search_pipeline(source, first, [first, even]).run())
+    assert handled == [0, 2, 4]
+
+
+def test_block_stage_makes_the_source_wait():
+    progress = []
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def source(emit):
+            for item in range(5):
+                await emit(item)
+                progress.append(item)
+            await release.wait()
+
+        async def stuck(item):
+            await release.wait()
+
+        stage = pipeline_stage('stuck', stuck, queue_size=2)
+        task = asyncio.ensure_future(search_pipeline(source, stage, [stage]).run())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+    # 하나는 처리중, 두 개는 큐에 있고 네 번째 emit 이 기다립니다.
+    assert progress == [0, 1, 2]
+
+
+def test_terminal_stage_value_finishes_the_pipeline():
+    async def source(emit):
+        item = 0
+        while True:
+            await emit(item)
+            item += 1
+
+    async def double(item):
+        return item * 2
+
+    async def finish_at_six(item):
+        return item if item >= 6 else None
+
+    first = pipeline_stage('double', double)
+    last = pipeline_stage('finish', finish_at_six)
+    first.then(last)
+    assert asyncio.run(search_pipeline(source, first, [first, last]).run()) == 6
+
+
+def test_stage_error_propagates():
+    async def source(emit):
+        await emit(1)
+        await asyncio.sleep(10)
+
+    async def broken(item):
+        raise KeyError(item)
+
+    stage = pipeline_stage('broken', broken)
+    with pytest.raises(KeyError):
+        asyncio.run(search_pipeline(source, stage, [stage]).run())
+
+
+def test_source_end_drains_queued_items():
+    handled = []
+
+    async def source(emit):
+        for item in range(3):
+            await emit(item)
+
+    async def collect(item):
+        await asyncio.sleep(0.01)
+        handled.append(item)
+
+    stage = pipeline_stage('collect', collect, queue_size=4)
+    assert asyncio.run(search_pipeline(source, stage, [stage]).run()) is None
+    assert handled == [0, 1, 2]
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+'''
+# capture / replay of kakao api traffic
+ - traffic_recorder : every left_count_by_coords and reservation response (status, Retry-After, raw body) or
+   timeout / connection error, with its offset from the start of the run, gzip json-lines written on a background thread
+ - the first line keeps the config of the recorded run, so the replay searches the same tiles
+ - replay_http_client : kakao_http_client without network. responses are served in recorded order per request body,
+   at the recorded pace (speed x) or as fast as possible (speed 0). decode, diff, ranking run exactly as in production
+ - user info (/api/v1/user) responses are not recorded (personal information)
+
+# usage
+ config.ini [config] record_traffic_file = traffic.jsonl.gz
+ python benchmarks/replay_recording.py traffic.jsonl.gz --speed 0
+'''
+
+import asyncio
+import gzip
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+import aiohttp
+
+from kakao_http import kakao_http_client
+
+RECORDING_FORMAT = 1
+RECORDED_SPANS = ('search', 'reservation')
+
+_STOP = object()
+
+
+class replay_finished(Exception):
+    """ 녹화된 조회 응답을 모두 사용했습니다. """
+
+
+class traffic_recorder(threading.Thread):
+    def __init__(self, path, config=None, flush_interval=1.0):
+        super().__init__(name='traffic-recorder', daemon=True)
+        self.path = path
+        self._config = config
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._start_time = time.monotonic()
+        self.record_count = 0
+
+    def record(self, span, request, status, body, retry_after=None):
+        # 조회 루프에서는 큐에 넣기만 하고, 직렬화와 압축은 기록 스레드에서 합니다.
+        if span in RECORDED_SPANS:
+            self._queue.put((time.monotonic() - self._start_time, span, request, status, body, retry_after, None))
+
+    def record_error(self, span, request, error):
+        if span in RECORDED_SPANS:
+            kind = 'timeout' if isinstance(error, asyncio.TimeoutError) else 'connect'
+            self._queue.put((time.monotonic() - self._start_time, span, request, None, None, None, kind))
+
+    def stop(self):
+        self._queue.put(_STOP)
+        self.join()
+
+    def run(self):
+        try:
+            recording = gzip.open(self.path, 'wt', encoding='utf-8')
+        except OSError as error:
+            logging.warning("traffic recorder error : %s", error)
+            return
+        with recording:
+            recording.write(self._line({"format": RECORDING_FORMAT, "started": time.time(),
+                                        "config": config_values(self._config)}))
+            last_flush = time.monotonic()
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    item = None
+                if item is _STOP:
+                    break
+                if item is not None:
+                    recording.write(self._line(self._entry(*item)))
+                    self.record_count += 1
+                if time.monotonic() - last_flush >= self.flush_interval:
+                    recording.flush()
+                    last_flush = time.monotonic()
+
+    @staticmethod
+    def _entry(offset, span, request, status, body, retry_after, error):
+        entry = {"t": round(offset, 6), "span": span, "request": _text(request)}
+        if error is not None:
+            entry["error"] = error
+        else:
+            entry["status"] = status
+            entry["body"] = _text(body)
+            if retry_after:
+                entry["retry_after"] = retry_after
+        return entry
+
+    @staticmethod
+    def _line(entry):
+        return json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def _text(data):
+    if isinstance(data, (bytes, bytearray)):
+        return bytes(data).decode('utf-8', 'replace')
+    return data
+
+
+def config_values(config):
+    """ 설정 객체의 단순 값(str, int, float, bool, None)만 dict 로 만듭니다. """
+    if config is None:
+        return {}
+    return {name: value for name, value in vars(config).items()
+            if not name.startswith('_') and (value is None or isinstance(value, (str, int, float, bool)))}
+
+
+def load_recording(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as recording:
+        header = json.loads(recording.readline())
+        if header.get("format") != RECORDING_FORMAT:
+            raise ValueError("unsupported recording format : %s" % header.get("format"))
+        entries = [json.loads(line) for line in recording if line.strip()]
+    return header, entries
+
+
+class replay_http_client(kakao_http_client):
+    def __init__(self, path, speed=1.0, metrics=None, user=None):
+        super().__init__(metrics=metrics)
+        self.header, entries = load_recording(path)
+        self.speed = speed  # 녹화 대비 재생 속도 배수 (0 이면 기다리지 않음)
+        self._user = user or {"name": "replay", "status": "NORMAL"}
+        self._searches = {}
+        self._reservations = {}
+        for entry in entries:
+            if entry["span"] == 'search':
+                self._searches.setdefault(entry["request"], deque()).append(entry)
+            elif entry["span"] == 'reservation':
+                self._reservations.setdefault(_org_code(entry["request"]), deque()).append(entry)
+        self.search_count = sum(len(responses) for responses in self._searches.values())
+        self.replayed = 0
+        self.unrecorded_reservations = 0
+        self._start = None
+
+    async def open(self):
+        if self._start is None:
+            self._start = asyncio.get_running_loop().time()
+
+    async def close(self):
+        pass
+
+    def remaining_searches(self):
+        return sum(len(responses) for responses in self._searches.values())
+
+    async def post_bytes(self, url, data, headers, cookies=None, timeout=None, span=None):
+        await self.open()
+        request = _text(data)
+        with self.metrics.span((span or 'http') + '.request'):
+            if span == 'reservation':
+                entry = self._next_reservation(request)
+            else:
+                responses = self._searches.get(request)
+                if not responses:
+                    raise replay_finished("no more recorded responses for %s" % request)
+                entry = responses.popleft()
+            await self._wait_until(entry.get("t", 0.0))
+        self.replayed += 1
+        return self._replay(entry)
+
+    async def get_json(self, url, headers, cookies=None, timeout=None, span=None):
+        return {"user": dict(self._user)}
+
+    def _next_reservation(self, request):
+        responses = self._reservations.get(_org_code(request))
+        if responses:
+            # 마지막 응답은 같은 병원에 다시 예약할 때를 위해 남겨 둡니다.
+            return responses.popleft() if len(responses) > 1 else responses[0]
+        # 녹화 당시 예약하지 않은 병원. 마감으로 응답합니다.
+        self.unrecorded_reservations += 1
+        return {"status": 200, "body": json.dumps({"code": "NO_VACANCY", "desc": "not in recording"})}
+
+    async def _wait_until(self, offset):
+        if not self.speed:
+            return
+        delay = offset / self.speed - (asyncio.get_running_loop().time() - self._start)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _replay(self, entry):
+        error = entry.get("error")
+        if error == 'timeout':
+            raise asyncio.TimeoutError()
+        if error is not None:
+            raise aiohttp.ClientConnectionError("recorded %s error" % error)
+        self._check_status(entry["status"], entry.get("retry_after"))
+        return entry["body"].encode('utf-8')
+
+
+def _org_code(request):
+    try:
+        return json.loads(request).get("orgCode")
+    except (TypeError, ValueError, AttributeError):
+        return None
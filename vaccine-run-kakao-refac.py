@@ -8,33 +8,64 @@
  - logging result, error
  - timeout and retry on vaccine find
  - design pattern refactoring
+ - shared keep-alive connection pool (kakao_http)
 
 # minor modified
  - console print formatting
  - adding debugging config
 '''
 
+import argparse
 import asyncio
 import aiohttp
 import logging
 
-import browser_cookie3
-import requests
 import configparser
 import json
 import os
+import signal
 import sys
 import time
-from playsound import playsound
 from datetime import datetime
 
-import urllib3
+from async_logging import start_logging
+from candidate_ranking import candidate_ranking
+from console_display import status_display
+from cookie_cache import cookie_cache
+from geo_tiling import tile_planner
+from hospital_cache import hospital_cache
+from instrumentation import hot_path_metrics, metrics_exporter
+from json_decoder import project_organizations
+from kakao_http import kakao_auth_error, kakao_http_client
+import notification
+from polling_scheduler import adaptive_polling_scheduler
+from request_templates import request_templates
+from reservation_cache import reservation_attempt_cache
+from reservation_scheduler import reservation_scheduler, reservation_stopped
+from retry_policy import (CONNECT, SERVER, circuit_breaker, circuit_open_error, classify_error, request_not_sent,
+                          retry_engine)
+from search_diff import org_state_table
+from search_pipeline import DROP_OLDEST, pipeline_stage, search_cycle, search_pipeline
+from service_checkpoint import service_checkpoint
+from session_monitor import session_health_monitor
+from stock_history import stock_history
+from traffic_replay import traffic_recorder
 
 # skip config for debug
 debug_config = False
 
-urllib3.disable_warnings()
-logging.basicConfig(filename='vaccine-run-kakao.log', level=logging.INFO, format='%(asctime)s %(message)s')
+log_file = 'vaccine-run-kakao.log'
+
+# 서비스 모드(--service) 설정 환경변수 접두어. 예) VACCINE_RUN_VACCINE_TYPE=VEN00013
+SERVICE_ENV_PREFIX = 'VACCINE_RUN_'
+
+# 서비스 모드(--service) 종료 코드
+EXIT_RESERVED = 0
+EXIT_STOPPED = 0
+EXIT_ERROR = 1
+EXIT_CONFIG = 2
+EXIT_DEADLINE = 3
+EXIT_USER = 4
 
 
 def close():
@@ -48,10 +79,6 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 
-def play_tada():
-    playsound(resource_path('tada.mp3'))
-
-
 def json_print(json_string):
     json_object = json.loads(json_string)
     for org in json_object["organizations"]:
@@ -89,60 +116,108 @@ class Headers:
     }
 
 
+class Endpoints:
+    # 모의 서버(mock_kakao_server.py) 등 다른 서버로 요청을 보낼 때 환경변수로 변경합니다.
+    map_base_url = os.environ.get('KAKAO_VACCINE_MAP_URL', 'https://vaccine-map.kakao.com').rstrip('/')
+    vaccine_base_url = os.environ.get('KAKAO_VACCINE_URL', 'https://vaccine.kakao.com').rstrip('/')
+
+    @classmethod
+    def set_base_url(cls, map_base_url=None, vaccine_base_url=None):
+        if map_base_url:
+            cls.map_base_url = map_base_url.rstrip('/')
+        if vaccine_base_url:
+            cls.vaccine_base_url = vaccine_base_url.rstrip('/')
+
+    @classmethod
+    def left_count_by_coords(cls):
+        return cls.map_base_url + '/api/v2/vaccine/left_count_by_coords'
+
+    @classmethod
+    def reservation(cls):
+        return cls.vaccine_base_url + '/api/v1/reservation'
+
+    @classmethod
+    def user(cls):
+        return cls.vaccine_base_url + '/api/v1/user'
+
+
 class kakao_user_info:
-    def __init__(self):
+    def __init__(self, http_client, user_cookie_cache=None):
+        self._http_client = http_client
+        self._cookie_cache = user_cookie_cache or cookie_cache()
         self._user_cookiejar = None
         self._user_cookie = None
         self._user_name = ""
         self._user_status = ""
 
-    def load(self):
-        self.__load_cookie()
-        self.__load_kakao_info()
+    async def load(self):
+        # 저장해 둔 쿠키가 있으면 Chrome 쿠키 저장소를 복호화하지 않고 바로 사용합니다.
+        self._user_cookie = self._cookie_cache.load()
+        if self._user_cookie is not None:
+            if await self.__load_kakao_info(report_error=False):
+                return True
+            self._cookie_cache.clear()
+        await asyncio.to_thread(self.__load_cookie)
+        return await self.__load_kakao_info()
 
     def __load_cookie(self):
-        self._user_cookiejar = browser_cookie3.chrome(domain_name=".kakao.com")
-        self._user_cookie = requests.utils.dict_from_cookiejar(self._user_cookiejar)
+        self._user_cookiejar, self._user_cookie = self.__reload_cookie()
 
     def __reload_cookie(self):
-        self.__load_cookie()
-
-    def __load_kakao_info(self):
-        while True:
-            user_info_api = 'https://vaccine.kakao.com/api/v1/user'
-            user_info_response = requests.get(user_info_api,
-                                              headers=Headers.headers_vacc, cookies=self._user_cookiejar,
-                                              verify=False)
-            user_info_json = json.loads(user_info_response.text)
-
-            if user_info_json.get('error'):
-                logging.info("사용자 정보를 불러오는데 실패하였습니다.")
-                print("사용자 정보를 불러오는데 실패하였습니다.")
-                print("Chrome 브라우저에서 카카오에 제대로 로그인되어있는지 확인해주세요.")
-                print("로그인이 되어 있는데도 안된다면, 카카오톡에 들어가서 잔여백신 알림 신청을 한번 해보세요. "
-                      "정보제공 동의가 나온다면 동의 후 다시 시도해주세요.")
-
-                # TODO: cookie reload after login
-                '''
-                webbrowser.open('https://accounts.kakao.com/login?continue=https://vaccine-map.kakao.com/map2?v=1')
-                login_try = str.lower(input("로그인을 완료하셨습니까? Y/N"))
-                if login_try == "y":
-                    self.__reload_cookie()
-                    continue
-                elif "y" == str.lower(input("종료하시겠습니까? Y/N")):
-                    return False
-                else:
-                    print("입력이 잘못되었습니다. 사용자 정보를 다시 불러옵니다.")
-                '''
+        import browser_cookie3
+        cookiejar = browser_cookie3.chrome(domain_name=".kakao.com")
+        return cookiejar, {cookie.name: cookie.value for cookie in cookiejar}
+
+    async def __fetch_user(self, cookies):
+        try:
+            user_info_json = await self._http_client.get_json(Endpoints.user(), headers=Headers.headers_vacc,
+                                                              cookies=cookies, span='user')
+        except kakao_auth_error:
+            return None
+        if user_info_json.get('error'):
+            return None
+        return user_info_json.get("user")
+
+    async def __load_kakao_info(self, report_error=True):
+        user_info = await self.__fetch_user(self._user_cookie)
+        if user_info is None:
+            if not report_error:
                 return False
-            else:
-                user_info = user_info_json.get("user")
-                self._user_name = user_info['name']
-                self._user_status = user_info['status']
+            logging.info("사용자 정보를 불러오는데 실패하였습니다.")
+            print("사용자 정보를 불러오는데 실패하였습니다.")
+            print("Chrome 브라우저에서 카카오에 제대로 로그인되어있는지 확인해주세요.")
+            print("로그인이 되어 있는데도 안된다면, 카카오톡에 들어가서 잔여백신 알림 신청을 한번 해보세요. "
+                  "정보제공 동의가 나온다면 동의 후 다시 시도해주세요.")
+            # 실행 중 로그인이 풀리면 session_health_monitor 가 쿠키를 다시 불러옵니다.
+            return False
 
-                logging.info("사용자 정보를 불러오는데 성공했습니다.")
-                print("사용자 정보를 불러오는데 성공했습니다.")
-                break
+        self._user_name = user_info['name']
+        self._user_status = user_info['status']
+        if self._user_cookiejar is not None:
+            self._cookie_cache.save(self._user_cookiejar)
+
+        logging.info("사용자 정보를 불러오는데 성공했습니다.")
+        print("사용자 정보를 불러오는데 성공했습니다.")
+        return True
+
+    async def validate(self):
+        """ 현재 쿠키로 /api/v1/user 를 다시 확인합니다. 로그인이 풀렸으면 False """
+        user_info = await self.__fetch_user(self._user_cookie)
+        if user_info is None:
+            return False
+        self._user_status = user_info.get('status', self._user_status)
+        return True
+
+    async def refresh(self):
+        """ Chrome 에서 쿠키를 다시 읽어 확인한 뒤, 유효하면 사용중인 쿠키를 교체합니다. """
+        cookiejar, cookie = await asyncio.to_thread(self.__reload_cookie)
+        user_info = await self.__fetch_user(cookie)
+        if user_info is None:
+            return False
+        # 조회, 예약은 요청마다 get_cookie() 를 읽으므로 교체 즉시 새 쿠키로 요청합니다.
+        self._user_cookiejar, self._user_cookie = cookiejar, cookie
+        self._user_status = user_info.get('status', self._user_status)
+        self._cookie_cache.save(cookiejar)
         return True
 
     def get_cookiejar(self):
@@ -156,102 +231,410 @@ class kakao_user_info:
 
 
 class vaccine_reservation:
-    def __init__(self, user_info):
+    def __init__(self, user_info, http_client, config=None, clock=time.monotonic, wall_clock=time.time, rng=None):
         self._user_info = user_info
-        self._config = config_vaccine_reservation()
-        self._config.load_config()
-
-        self.search_interval = 0.1  # 잔여백신을 해당 시간마다 한번씩 검색합니다. 단위: 초
-        self.request_error_count = 0
-        self.request_error_limit = 5
+        self._http_client = http_client
+        self._metrics = http_client.metrics
+        if config is None:
+            config = config_vaccine_reservation()
+            config.load_config()
+        self._config = config
+        # 시뮬레이터(benchmarks/simulate_polling.py)는 가상 시계와 고정 seed 의 rng 를 넘깁니다.
+        self._clock = clock
+        self._rng = rng
+
+        self.search_interval = self._config.search_interval  # 잔여백신 검색 주기의 최솟값. 단위: 초
+        self.stats = {"searches": 0, "search_errors": 0, "reservation_attempts": 0, "reservations_skipped": 0,
+                      "runtime_s": 0.0}
+        self._started = self._clock()
+
+        # 병원 검색 요청의 단계별 제한 시간. 단위: 초
+        self.search_connect_timeout = 1
+        self.search_read_timeout = 3
+        self.search_total_timeout = 5
+        self._search_timeout = kakao_http_client.timeout(total=self.search_total_timeout,
+                                                         connect=self.search_connect_timeout,
+                                                         read=self.search_read_timeout)
+
+        # 응답 시간, 에러율, Retry-After 에 따라 search_interval ~ search_interval_max 사이에서 주기를 조절합니다.
+        self._polling = adaptive_polling_scheduler(self.search_interval, self._config.search_interval_max,
+                                                   self._config.search_target_latency, rng=rng)
+        self._reservation_scheduler = reservation_scheduler(self._config.reservation_concurrency)
+        # 에러 종류별로 대기 시간을 늘리고, 장애가 계속되면 회로를 열어 요청을 멈췄다가 자동으로 복구합니다.
+        # 조회는 다음 주기가 재시도이므로 한 번만 시도합니다. 예약은 요청이 서버에 전달되지 않은 것이 확실한 에러
+        # (연결 실패, 429)만 바로 한 번 더 시도합니다. 5xx, 연결 끊김은 이미 처리되었을 수 있어 다시 보내지 않습니다.
+        self._search_retry = retry_engine('search', breaker=self.__circuit_breaker(), rng=rng)
+        self._reservation_retry = retry_engine('reservation', max_attempts=2, retry_on=(CONNECT, SERVER),
+                                               backoff={CONNECT: (0.05, 0.2), SERVER: (0.1, 0.5)},
+                                               breaker=self.__circuit_breaker(), rng=rng, retry_if=request_not_sent)
+        self._org_states = org_state_table()
+        self._attempt_cache = reservation_attempt_cache(self._config.vaccine_type, self._config.negative_cache_ttl,
+                                                        clock=clock)
+        self._hospital_cache = hospital_cache(self._config.hospital_cache_file)
+        home_longitude, home_latitude = self._config.get_home()
+        self._candidate_ranking = candidate_ranking(home_longitude, home_latitude,
+                                                    top_n=self._config.reservation_top_n, clock=wall_clock)
+        self._tile_planner = tile_planner(self._config.top_left_longitude, self._config.top_left_latitude,
+                                          self._config.bottom_right_longitude, self._config.bottom_right_latitude,
+                                          rows=self._config.tile_rows, cols=self._config.tile_cols,
+                                          home=(home_longitude, home_latitude),
+                                          hot_count=self._config.tile_hot_count,
+                                          cold_every=self._config.tile_cold_every)
+        # 잔여백신이 나온 시각을 기록해 두고, 자주 나오던 시간대에는 촘촘하게, 드문 시간대에는 느슨하게 조회합니다.
+        self._stock_history = stock_history(self._config.stock_history_file, clock=wall_clock)
+        self._profile = None
+        self._profile_hour = None
+        # 조회, 예약 요청 본문과 헤더는 여기서 미리 만들어 두고 예약마다 orgCode 만 채웁니다.
+        self._request_templates = request_templates(self._config.vaccine_type, Headers.headers_map,
+                                                    Headers.headers_vacc, self._tile_planner.tiles)
+        # 조회 결과 출력은 조회 주기와 관계없이 display_fps 이하로만 다시 그립니다.
+        self._display = status_display(self._hospital_cache, self._metrics, max_fps=self._config.display_fps)
+        # 예약 성공 알림음 등은 별도 스레드에서 전달하므로 예약 요청을 기다리게 하지 않습니다.
+        self._notifier = notification.notification_dispatcher(
+            notification.build_sinks(self._config.notifications, resource_path('tada.mp3')))
+        # 실행 중 로그인 세션이 만료되면 조회를 멈추지 않고 쿠키를 다시 불러옵니다.
+        self._session_monitor = session_health_monitor(self._user_info, self._config.session_check_interval,
+                                                       display=self._display, notifier=self._notifier)
+
+    def __circuit_breaker(self):
+        return circuit_breaker(self._config.circuit_failure_threshold, self._config.circuit_reset_timeout,
+                               clock=self._clock)
 
     async def find_vaccine(self):
-        url = 'https://vaccine-map.kakao.com/api/v2/vaccine/left_count_by_coords'
-        data = {"bottomRight": {"x": self._config.bottom_right_longitude,
-                                "y": self._config.bottom_right_latitude},
-                "topLeft": {"x": self._config.top_left_longitude,
-                            "y": self._config.top_left_latitude},
-                "onlyLeft": False, "order": "latitude"}
+        url = Endpoints.left_count_by_coords()
 
         print("--------------------------------------------------")
         print("잔여백신 조회를 시작하겠습니다.")
 
+        exporter = await metrics_exporter(self._metrics, self._config.metrics_file, self._config.metrics_port,
+                                          self._config.metrics_interval).start()
+        self._hospital_cache.open()
+        self._display.start()
+        self._notifier.start()
+        self._session_monitor.start()
+        profile_task = asyncio.ensure_future(self._profile_loop())
+        pipeline = self._build_pipeline(url)
+        try:
+            return await pipeline.run()
+        finally:
+            logging.info("search pipeline %s", pipeline.stats())
+            profile_task.cancel()
+            await asyncio.gather(profile_task, return_exceptions=True)
+            self._stock_history.flush()
+            await self._session_monitor.stop()
+            await self._display.stop()
+            # 남은 알림(예약 성공 알림음 등)을 전달할 때까지 기다립니다.
+            await asyncio.to_thread(self._notifier.stop)
+            await exporter.stop()
+            self._hospital_cache.close()
+
+    async def _profile_loop(self):
+        # numpy 집계는 조회 루프를 막지 않도록 별도 스레드에서 하고, 한 시간마다 새 기록을 반영합니다.
         while True:
+            self._stock_history.flush()
             try:
-                await asyncio.sleep(self.search_interval)
-                start_time = time.time()
-                try:
-                    response = requests.post(url,
-                                             data=json.dumps(data), headers=Headers.headers_map,
-                                             verify=False, timeout=5)
-                    json_data = json.loads(response.text).get("organizations")
-                except requests.exceptions.Timeout:
-                    print("병원 검색이 원활하지 않습니다. 재검색 하겠습니다.")
-                    continue
-                end_time = time.time()
-
-                print("--------------------------------------------------")
-                print(datetime.now())
-                print("조회 병원 수 : %d " % len(json_data),
-                      "검색 시간 : %s 초" % round((end_time - start_time), 3))
-
-                # Future Work
-                # need managing each 'try_reservation' async
-                # one of them return True(as 'success'), then cancel others
-                result = await asyncio.gather(*[self._try_reservation(org) for org in json_data])
-                if True in result:
-                    break
-
-            except requests.exceptions.RequestException as error:
-                print("RequestException : ", error)
-                logging.warning(error)
-                self.request_error_count += 1
-                if self.request_error_count >= self.request_error_limit:
-                    logging.error("too many request error")
-                    break
-                else:
-                    continue
-            except Exception as exception:
-                print("Exception : ", exception)
-                logging.error("Exception error : %s" % exception)
-                sys.exit(-1)
-
-    async def _try_reservation(self, org):
-        if org.get('status') != "AVAILABLE" and org.get('leftCounts') == 0:
+                profile = await asyncio.to_thread(self._stock_history.profile, self._tile_planner.grid(),
+                                                  self._config.history_min_days)
+            except Exception as error:
+                logging.warning("stock history profile error : %s", error)
+                profile = None
+            if profile is not None:
+                self._profile = profile
+                self._profile_hour = None
+            await asyncio.sleep(3600)
+
+    def _apply_history_schedule(self):
+        """ 시간대가 바뀌면 그 시간대의 잔여백신 기록에 맞춰 조회 주기와 타일 우선순위를 바꿉니다. """
+        if self._profile is None:
+            return
+        hour = self._stock_history.current_hour()
+        if hour == self._profile_hour:
+            return
+        self._profile_hour = hour
+        interval = self._profile.interval(hour, self.search_interval,
+                                          max(self._config.search_interval_quiet, self.search_interval))
+        self._polling.min_interval = min(interval, self._polling.max_interval)
+        self._tile_planner.set_stock_rates(self._profile.tile_rates(hour))
+        logging.info("history schedule hour %d interval %.3f s (%d days)", hour, self._polling.min_interval,
+                     self._profile.days)
+
+    def checkpoint_state(self):
+        """ 재시작 후 이어서 조회할 수 있도록 저장할 상태 (service_checkpoint) """
+        stats = dict(self.stats)
+        stats["runtime_s"] = round(stats["runtime_s"] + self._clock() - self._started, 3)
+        return {"saved_at": time.time(),
+                "stats": stats,
+                "ranking": self._candidate_ranking.history(),
+                "tiles": self._tile_planner.state(),
+                "organizations": self._org_states.snapshot()}
+
+    def restore_checkpoint(self, state):
+        if not state:
             return False
+        for name, value in state.get("stats", {}).items():
+            if name in self.stats:
+                self.stats[name] += value
+        self._candidate_ranking.restore_history(state.get("ranking"))
+        self._tile_planner.restore(state.get("tiles"))
+        # 잔여백신이 있던 병원은 복원하지 않습니다. (첫 조회에서 변경분으로 나와 바로 예약을 시도하도록)
+        self._org_states.restore({org_code: org_state for org_code, org_state in state.get("organizations", {}).items()
+                                  if not self._is_reservation_candidate({'status': org_state[0],
+                                                                         'leftCounts': org_state[1]})})
+        return True
 
-        logging.info("잔여백신 병원정보 : %s" % org)
-        print("%s에 %s를 예약을 진행합니다." % (org['orgName'], self._config.vaccine_type))
+    def _build_pipeline(self, url):
+        # 조회 결과는 순서대로 처리해야 하므로(이전 조회와 비교) decode, diff, rank 는 하나씩 처리하고,
+        # 뒤 단계가 밀리면 큐가 차서 조회 루프가 기다립니다.
+        decode = pipeline_stage('decode', self._decode_stage)
+        diff = pipeline_stage('diff', self._diff_stage)
+        rank = pipeline_stage('rank', self._rank_stage)
+        # 예약과 출력은 조회를 기다리게 하지 않습니다. 밀리면 가장 오래된 항목을 버립니다.
+        reserve = pipeline_stage('reserve', self._reserve_stage, concurrency=self._config.reservation_batches,
+                                 queue_size=4, overflow=DROP_OLDEST, accepts=lambda cycle: cycle.candidates,
+                                 on_drop=self._drop_candidates)
+        report = pipeline_stage('report', self._report_stage, queue_size=8, overflow=DROP_OLDEST)
+        decode.then(diff)
+        diff.then(rank)
+        rank.then(reserve, report)
+        return search_pipeline(lambda emit: self._fetch_loop(url, emit, (decode, diff)), decode,
+                               (decode, diff, rank, reserve, report), self._metrics)
+
+    async def _fetch_loop(self, url, emit, planning_stages):
+        loop = asyncio.get_running_loop()
+        next_search_time = loop.time()
+        while True:
+            # 검색 주기는 이전 요청의 시작 시각부터 계산합니다. (요청 시간만큼 주기가 밀리지 않도록)
+            delay = next_search_time - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._apply_history_schedule()
+            request_time = loop.time()
+
+            cycle = search_cycle(self._tile_planner.tiles_due(), time.perf_counter_ns())
+            try:
+                # 응답 내용은 decode 단계에서 확인한 뒤 성공으로 처리합니다.
+                cycle.bodies = await self._search_retry.attempt(self._fetch_tiles, url, cycle.tiles)
+            except circuit_open_error as error:
+                # 회로가 열린 동안에는 검색을 멈추고, reset 시간이 지나면 확인 요청 하나로 복구 여부를 봅니다.
+                next_search_time = request_time + max(error.retry_in, self.search_interval)
+                if error.retry_in > 0:
+                    self._display.message("병원 검색 장애가 계속되어 %.1f 초 동안 검색을 멈춥니다." % error.retry_in)
+                    self._notifier.notify(notification.SEARCH_PAUSED, "병원 검색 일시 중지",
+                                          "%.1f 초 후 다시 검색합니다." % error.retry_in)
+                continue
+            except Exception as error:
+                kind = classify_error(error)
+                if kind is None:
+                    raise
+                next_search_time = request_time + self._search_failed(error, kind)
+                continue
+            cycle.latency = loop.time() - request_time
+            await emit(cycle)
+            # 다음 조회 주기와 조회할 영역은 decode, diff 결과(응답 확인, observe, record_stock)로 정하므로
+            # 두 단계가 끝나기를 기다립니다. (수 ms 이내. 예약, 출력은 기다리지 않습니다.)
+            for stage in planning_stages:
+                await stage.idle()
+            next_search_time = request_time + cycle.interval
+
+    def _search_failed(self, error, kind):
+        """ 조회 실패를 기록하고 다음 조회까지의 대기 시간을 반환합니다. """
+        retry_after = getattr(error, 'retry_after', None)
+        self.stats["search_errors"] += 1
+        self._polling.on_failure(retry_after)
+        logging.warning("search %s error : %s", kind, error)
+        self._display.message("병원 검색이 원활하지 않습니다. (%s) 재검색 하겠습니다." % kind)
+        return max(self._polling.next_interval(), self._search_retry.delay(kind, retry_after))
+
+    async def _decode_stage(self, cycle):
+        try:
+            cycle.organizations = self._decode_tiles(cycle.tiles, cycle.bodies)
+        except Exception as error:
+            kind = self._search_retry.on_failure(error)
+            if kind is None:
+                raise
+            # 응답 형식이 잘못된 경우에도 조회 실패와 같은 대기 시간(MALFORMED backoff)을 적용합니다.
+            cycle.interval = self._search_failed(error, kind)
+            return None
+        self._search_retry.on_success()
+        self._polling.on_success(cycle.latency)
+        cycle.interval = self._polling.next_interval()
+        self.stats["searches"] += 1
+        cycle.bodies = None
+        return cycle
+
+    async def _diff_stage(self, cycle):
+        # 이전 조회 결과에서 상태가 바뀐 병원만 출력과 예약 대상으로 넘깁니다.
+        with self._metrics.span('candidate.filter'):
+            # 예약 실패 후 차단 시간이 지난 병원은 아직 잔여백신이 보이면 다시 변경분으로 나오도록 합니다.
+            for org_code in self._attempt_cache.expire():
+                self._org_states.forget(org_code)
+            cycle.transitions = self._org_states.update(cycle.organizations,
+                                                        complete=len(cycle.tiles) == len(self._tile_planner.tiles))
+            candidates = [transition.org for transition in cycle.transitions
+                          if self._is_reservation_candidate(transition.org)]
+            for org in candidates:
+                self._tile_planner.record_stock(org)
+                self._stock_history.record(org)
+            self._stock_history.observe()
+            cycle.candidates = [org for org in candidates if not self._attempt_cache.blocked(org)]
+            self.stats["reservations_skipped"] += len(candidates) - len(cycle.candidates)
+        return cycle
+
+    async def _rank_stage(self, cycle):
+        ranked = self._candidate_ranking.rank(cycle.candidates)
+        if len(ranked) < len(cycle.candidates):
+            # top-N 에서 빠진 후보는 다음 조회에서 다시 변경분으로 나오도록 합니다. (잔여백신이 남아 있는 동안 차례로 시도)
+            kept = {org.get('orgCode') for org in ranked}
+            for org in cycle.candidates:
+                if org.get('orgCode') not in kept:
+                    self._org_states.forget(org.get('orgCode'))
+        cycle.candidates = ranked
+        # 조회 시작부터 예약 후보가 정해질 때까지
+        self._metrics.record('cycle', time.perf_counter_ns() - cycle.start_ns)
+        return cycle
+
+    async def _reserve_stage(self, cycle):
+        # 처음 성공한 예약이 나오면 나머지 진행중인 예약 요청은 취소됩니다.
+        return await self._reservation_scheduler.run(self._try_reservation, cycle.candidates)
+
+    def _drop_candidates(self, cycle):
+        # 예약하지 못하고 버린 후보는 다음 조회에서 다시 변경분으로 나오도록 합니다.
+        for org in cycle.candidates:
+            self._org_states.forget(org.get('orgCode'))
+
+    async def _report_stage(self, cycle):
+        self._display.update(tiles="%d/%d" % (len(cycle.tiles), len(self._tile_planner.tiles)),
+                             organizations=len(cycle.organizations), changed=len(cycle.transitions),
+                             latency=cycle.latency, interval=cycle.interval)
+        self._display.changes(cycle.transitions)
+        # 변경 없는 조회는 반복되므로 일부만 기록합니다. 변경이 있는 조회(예약 시도 포함)는 모두 기록합니다.
+        logging.info("search %d orgs, %d changed, %d candidates, %.3f s",
+                     len(cycle.organizations), len(cycle.transitions), len(cycle.candidates), cycle.latency,
+                     extra=None if cycle.transitions else {'sample_key': 'search.unchanged'})
+
+    async def _search_tiles(self, url, tiles):
+        return self._decode_tiles(tiles, await self._fetch_tiles(url, tiles))
+
+    async def _fetch_tiles(self, url, tiles):
+        # 취소(CancelledError)는 그대로 전파되어 진행중인 요청과 커넥션이 정리됩니다.
+        if len(tiles) == 1:
+            return [await self._fetch_tile(url, tiles[0])]
+        return await asyncio.gather(*[self._fetch_tile(url, tile) for tile in tiles])
+
+    def _fetch_tile(self, url, tile):
+        return self._http_client.post_bytes(url, data=self._request_templates.search_body(tile),
+                                            headers=self._request_templates.search_headers,
+                                            timeout=self._search_timeout, span='search')
+
+    def _decode_tiles(self, tiles, bodies):
+        if len(tiles) == 1:
+            organizations = self._decode_search(bodies[0])
+            self._tile_planner.observe(tiles[0], organizations)
+            return organizations
+
+        merged = {}
+        for tile, body in zip(tiles, bodies):
+            organizations = self._decode_search(body)
+            self._tile_planner.observe(tile, organizations)
+            for org in organizations:
+                merged[org.orgCode] = org
+        return list(merged.values())
+
+    def _decode_search(self, body):
+        response_json = self._http_client.decode(body, 'search')
+        # 병원 이름, 주소 등은 처음 볼 때만 hospital_cache 에 저장하고, 조회 루프에는 필요한 값만 가진 org_record 를 넘깁니다.
+        organizations = response_json.get("organizations") if isinstance(response_json, dict) else None
+        if not isinstance(organizations, list):
+            raise ValueError("malformed left_count_by_coords response")
+        if organizations:
+            self._hospital_cache.learn(organizations)
+        return project_organizations(organizations)
+
+    @staticmethod
+    def _is_reservation_candidate(org):
+        return not (org.get('status') != "AVAILABLE" and org.get('leftCounts') == 0)
 
+    async def _try_reservation(self, org):
         organization_code = org.get('orgCode')
-        reservation_url = 'https://vaccine.kakao.com/api/v1/reservation'
-        data = {"from": "Map", "vaccineCode": self._config.vaccine_type, "orgCode": organization_code,
-                "distance": "null"}
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(reservation_url, data=json.dumps(data), headers=Headers.headers_vacc,
-                                    cookies=self._user_info.get_cookie(), verify_ssl=False) as response:
-                response_json = await response.json()
-                logging.info(response_json)
-
-                if 'code' in response_json:
-                    if response_json['code'] == "SUCCESS":
-                        print("신청이 완료되었습니다.")
-                        organization_code_success = response_json.get("organization")
-                        logging.info("SUCCESS %s %s" % (org['orgName'], self._config.vaccine_type))
-                        print(
-                            f"병원이름: {organization_code_success.get('orgName')}\t"
-                            f"전화번호: {organization_code_success.get('phoneNumber')}\t"
-                            f"주소: {organization_code_success.get('address')}\t"
-                            f"운영시간: {organization_code_success.get('openHour')}")
-                        play_tada()
-                        return True
-                    else:
-                        print(response_json['desc'])
-                        return False
+        # 같은 병원에 진행중인 예약 요청이 있으면 보내지 않습니다.
+        if not self._attempt_cache.begin(organization_code):
+            self.stats["reservations_skipped"] += 1
+            return False
+        try:
+            return await self._request_reservation(org)
+        finally:
+            self._attempt_cache.end(organization_code)
+
+    async def _request_reservation(self, org):
+        with self._metrics.span('reservation.attempt'):
+            logging.info("잔여백신 병원정보 : %s", org)
+            self.stats["reservation_attempts"] += 1
+            organization_code = org.get('orgCode')
+            organization_name = self._hospital_cache.name(organization_code)
+            self._display.message("%s에 %s를 예약을 진행합니다." % (organization_name, self._config.vaccine_type))
+
+            reservation_url = Endpoints.reservation()
+            templates = self._request_templates
+
+            try:
+                response_json = await self._reservation_retry.call(
+                    self._http_client.post_json, reservation_url, data=templates.reservation_body(organization_code),
+                    headers=templates.reservation_headers(self._user_info.get_cookie()), span='reservation')
+            except circuit_open_error as error:
+                self._display.message("예약 요청 장애가 계속되어 %.1f 초 동안 예약을 미룹니다." % error.retry_in)
+                self._org_states.forget(organization_code)
+                return False
+            except kakao_auth_error:
+                # 로그인 세션 만료. 쿠키를 교체한 뒤 다음 조회에서 다시 시도합니다.
+                self._session_monitor.report_auth_failure()
+                self._display.message("로그인 세션이 만료되어 예약하지 못했습니다.")
+                self._org_states.forget(organization_code)
+                return False
+            except (asyncio.TimeoutError, aiohttp.ClientError, ValueError):
+                # 응답을 받지 못했으므로 다음 조회에서 다시 예약을 시도합니다.
+                self._org_states.forget(organization_code)
+                raise
+            logging.info("%s", response_json)
+
+            if response_json.get('code') == "ALREADY_RESERVED":
+                # 병원이 아니라 사용자의 상태이므로 다른 병원에도 더 이상 요청하지 않고 조회를 끝냅니다.
+                logging.info("ALREADY_RESERVED %s", organization_code)
+                raise reservation_stopped(response_json['code'], response_json.get('desc') or "")
+
+            if 'code' in response_json:
+                self._candidate_ranking.record(organization_code, response_json['code'] == "SUCCESS")
+                if response_json['code'] == "SUCCESS":
+                    self._attempt_cache.record_success(organization_code)
+                    self._display.message("신청이 완료되었습니다.")
+                    self._hospital_cache.put(response_json.get("organization"))
+                    organization_code_success = self._hospital_cache.get(organization_code) or {}
+                    logging.info("SUCCESS %s %s", organization_name, self._config.vaccine_type)
+                    self._display.message(
+                        f"병원이름: {organization_code_success.get('orgName')}\t"
+                        f"전화번호: {organization_code_success.get('phoneNumber')}\t"
+                        f"주소: {organization_code_success.get('address')}\t"
+                        f"운영시간: {organization_code_success.get('openHour')}")
+                    self._notifier.notify(notification.RESERVED, "잔여백신 예약 완료",
+                                          "%s %s" % (organization_code_success.get('orgName') or organization_name,
+                                                     organization_code_success.get('address') or ""),
+                                          orgCode=organization_code, vaccineCode=self._config.vaccine_type)
+                    return True
                 else:
-                    print("ERROR. 응답이 없습니다.")
+                    # 실패 코드별로 정해진 시간 동안 같은 병원에 다시 요청하지 않습니다.
+                    self._attempt_cache.record_failure(organization_code, response_json['code'],
+                                                       org.get('leftCounts'))
+                    self._display.message(response_json['desc'])
+                    self._notifier.notify(notification.RESERVATION_FAILED, "잔여백신 예약 실패",
+                                          response_json.get('desc') or response_json['code'],
+                                          orgCode=organization_code, code=response_json['code'])
                     return False
+            else:
+                if response_json.get('error'):
+                    # 인증 실패를 200 응답으로 보내는 경우
+                    self._session_monitor.report_auth_failure()
+                self._display.message("ERROR. 응답이 없습니다.")
+                self._org_states.forget(organization_code)
+                return False
 
 
 class config_vaccine_reservation:
@@ -262,6 +645,80 @@ class config_vaccine_reservation:
         self.bottom_right_longitude = ""
         self.bottom_right_latitude = ""
 
+        # 선택 설정 (config.ini 에 없으면 기본값을 사용합니다.)
+        self.search_interval = 0.1  # 잔여백신 검색 주기의 최솟값. 단위: 초
+        self.search_interval_max = 5.0  # 응답이 느리거나 에러가 계속될 때 늘어나는 검색 주기의 최댓값. 단위: 초
+        self.search_target_latency = 0.5  # 검색 응답 시간이 이 값을 넘으면 주기를 늘립니다. 단위: 초
+        self.reservation_concurrency = 4  # 동시에 진행할 예약 요청 수
+        self.reservation_top_n = 10  # 한 번의 조회에서 예약을 시도할 최대 병원 수 (0 이면 전체)
+        self.reservation_batches = 2  # 동시에 예약을 진행할 조회 결과 수 (요청 수는 모두 합해 reservation_concurrency 이하)
+        self.negative_cache_ttl = 60.0  # 예약 실패(NO_VACANCY 등) 후 같은 병원에 다시 요청하지 않는 시간. 단위: 초 (0 이면 사용하지 않음)
+        self.home_longitude = None  # 거리 계산 기준 경도(x), 없으면 조회 범위의 중심
+        self.home_latitude = None  # 거리 계산 기준 위도(y), 없으면 조회 범위의 중심
+        self.tile_rows = 1  # 조회 범위를 나눌 행 수 (1x1 이면 전체 범위를 한 번에 조회)
+        self.tile_cols = 1  # 조회 범위를 나눌 열 수
+        self.tile_hot_count = 2  # 매 조회마다 검색할 우선순위 상위 영역 수
+        self.tile_cold_every = 5  # 나머지 영역의 검색 간격. 단위: 조회 횟수
+        self.display_fps = 4  # 조회 상태 화면을 다시 그리는 초당 최대 횟수
+        self.hospital_cache_file = "hospital-cache.sqlite3"  # 병원 정보 캐시 파일 (없으면 메모리에만 보관)
+        self.metrics_file = ""  # 구간별 소요시간을 json-lines 로 기록할 파일 (없으면 기록하지 않음)
+        self.metrics_port = 0  # prometheus 형식 /metrics 를 제공할 로컬 포트 (0 이면 사용하지 않음)
+        self.metrics_interval = 10.0  # metrics_file 기록 주기. 단위: 초
+        self.session_check_interval = 300.0  # 로그인 세션(/api/v1/user) 확인 주기. 단위: 초 (0 이면 사용하지 않음)
+        self.circuit_failure_threshold = 5  # 조회, 예약 요청이 연속으로 이 횟수만큼 실패하면 잠시 요청을 멈춥니다.
+        self.circuit_reset_timeout = 10.0  # 요청을 멈춘 뒤 다시 확인하기까지의 시간 (실패가 계속되면 최대 60초까지 늘어남). 단위: 초
+        self.record_traffic_file = ""  # 조회, 예약 응답을 재생용으로 기록할 파일 (.jsonl.gz, 없으면 기록하지 않음)
+        self.checkpoint_file = "service-checkpoint.json"  # 서비스 모드에서 조회 상태를 저장할 파일
+        self.checkpoint_interval = 60.0  # 서비스 모드 조회 상태 저장 주기. 단위: 초
+        self.notifications = "sound"  # 알림 방법 (sound, console, desktop, file:경로, webhook:url 을 쉼표로 구분)
+        self.stock_history_file = "stock-history.bin"  # 잔여백신이 나온 병원, 시각 기록 파일 (없으면 기록하지 않음)
+        self.search_interval_quiet = 1.0  # 잔여백신이 거의 나오지 않던 시간대의 검색 주기. 단위: 초
+        self.history_min_days = 3  # 시간대별 검색 주기를 적용하기 전에 필요한 기록 일수
+
+    def __load_tuning(self, config):
+        self.search_interval = config.getfloat('search_interval', fallback=self.search_interval)
+        self.search_interval_max = config.getfloat('search_interval_max', fallback=self.search_interval_max)
+        self.search_target_latency = config.getfloat('search_target_latency',
+                                                     fallback=self.search_target_latency)
+        self.reservation_concurrency = config.getint('reservation_concurrency',
+                                                     fallback=self.reservation_concurrency)
+        self.reservation_top_n = config.getint('reservation_top_n', fallback=self.reservation_top_n)
+        self.reservation_batches = config.getint('reservation_batches', fallback=self.reservation_batches)
+        self.negative_cache_ttl = config.getfloat('negative_cache_ttl', fallback=self.negative_cache_ttl)
+        self.home_longitude = config.getfloat('home_longitude', fallback=self.home_longitude)
+        self.home_latitude = config.getfloat('home_latitude', fallback=self.home_latitude)
+        self.tile_rows = config.getint('tile_rows', fallback=self.tile_rows)
+        self.tile_cols = config.getint('tile_cols', fallback=self.tile_cols)
+        self.tile_hot_count = config.getint('tile_hot_count', fallback=self.tile_hot_count)
+        self.tile_cold_every = config.getint('tile_cold_every', fallback=self.tile_cold_every)
+        self.display_fps = config.getfloat('display_fps', fallback=self.display_fps)
+        self.hospital_cache_file = config.get('hospital_cache_file', fallback=self.hospital_cache_file)
+        self.metrics_file = config.get('metrics_file', fallback=self.metrics_file)
+        self.metrics_port = config.getint('metrics_port', fallback=self.metrics_port)
+        self.metrics_interval = config.getfloat('metrics_interval', fallback=self.metrics_interval)
+        self.session_check_interval = config.getfloat('session_check_interval',
+                                                      fallback=self.session_check_interval)
+        self.circuit_failure_threshold = config.getint('circuit_failure_threshold',
+                                                       fallback=self.circuit_failure_threshold)
+        self.circuit_reset_timeout = config.getfloat('circuit_reset_timeout', fallback=self.circuit_reset_timeout)
+        self.record_traffic_file = config.get('record_traffic_file', fallback=self.record_traffic_file)
+        self.checkpoint_file = config.get('checkpoint_file', fallback=self.checkpoint_file)
+        self.checkpoint_interval = config.getfloat('checkpoint_interval', fallback=self.checkpoint_interval)
+        self.notifications = config.get('notifications', fallback=self.notifications)
+        self.stock_history_file = config.get('stock_history_file', fallback=self.stock_history_file)
+        self.search_interval_quiet = config.getfloat('search_interval_quiet', fallback=self.search_interval_quiet)
+        self.history_min_days = config.getint('history_min_days', fallback=self.history_min_days)
+        notification.build_sinks(self.notifications)  # 잘못된 알림 설정이면 ValueError
+
+    def get_home(self):
+        if self.home_longitude is not None and self.home_latitude is not None:
+            return self.home_longitude, self.home_latitude
+        try:
+            return ((float(self.top_left_longitude) + float(self.bottom_right_longitude)) / 2,
+                    (float(self.top_left_latitude) + float(self.bottom_right_latitude)) / 2)
+        except ValueError:
+            return None, None
+
     def __dump_config(self):
         config_parser = configparser.ConfigParser()
         config_parser['config'] = {}
@@ -271,6 +728,35 @@ class config_vaccine_reservation:
         conf['top_left_latitude'] = self.top_left_latitude
         conf['bottom_right_longitude'] = self.bottom_right_longitude
         conf['bottom_right_latitude'] = self.bottom_right_latitude
+        conf['search_interval'] = str(self.search_interval)
+        conf['search_interval_max'] = str(self.search_interval_max)
+        conf['search_target_latency'] = str(self.search_target_latency)
+        conf['reservation_concurrency'] = str(self.reservation_concurrency)
+        conf['reservation_top_n'] = str(self.reservation_top_n)
+        conf['reservation_batches'] = str(self.reservation_batches)
+        conf['negative_cache_ttl'] = str(self.negative_cache_ttl)
+        conf['tile_rows'] = str(self.tile_rows)
+        conf['tile_cols'] = str(self.tile_cols)
+        conf['tile_hot_count'] = str(self.tile_hot_count)
+        conf['tile_cold_every'] = str(self.tile_cold_every)
+        conf['display_fps'] = str(self.display_fps)
+        conf['hospital_cache_file'] = self.hospital_cache_file
+        conf['metrics_file'] = self.metrics_file
+        conf['metrics_port'] = str(self.metrics_port)
+        conf['metrics_interval'] = str(self.metrics_interval)
+        conf['session_check_interval'] = str(self.session_check_interval)
+        conf['circuit_failure_threshold'] = str(self.circuit_failure_threshold)
+        conf['circuit_reset_timeout'] = str(self.circuit_reset_timeout)
+        conf['record_traffic_file'] = self.record_traffic_file
+        conf['checkpoint_file'] = self.checkpoint_file
+        conf['checkpoint_interval'] = str(self.checkpoint_interval)
+        conf['notifications'] = self.notifications
+        conf['stock_history_file'] = self.stock_history_file
+        conf['search_interval_quiet'] = str(self.search_interval_quiet)
+        conf['history_min_days'] = str(self.history_min_days)
+        if self.home_longitude is not None and self.home_latitude is not None:
+            conf['home_longitude'] = str(self.home_longitude)
+            conf['home_latitude'] = str(self.home_latitude)
 
         with open("config.ini", "w") as config_file:
             config_parser.write(config_file)
@@ -326,6 +812,30 @@ class config_vaccine_reservation:
         self.__dump_config()
         return True
 
+    def load_service_config(self, path='config.ini', environ=None):
+        """ 입력 없이 설정 파일과 환경변수(VACCINE_RUN_<설정 이름>)에서 설정을 읽습니다. 필수 설정이 없으면 ValueError """
+        environ = os.environ if environ is None else environ
+        config_parser = configparser.ConfigParser()
+        config_parser.read(path)
+        if not config_parser.has_section('config'):
+            config_parser.add_section('config')
+        config = config_parser['config']
+        for name, value in environ.items():
+            if name.startswith(SERVICE_ENV_PREFIX):
+                config[name[len(SERVICE_ENV_PREFIX):].lower()] = value
+
+        for key in ('vaccine_type', 'top_left_longitude', 'top_left_latitude', 'bottom_right_longitude',
+                    'bottom_right_latitude'):
+            if not config.get(key):
+                raise ValueError("%s 설정이 없습니다. (%s 또는 %s%s)" % (key, path, SERVICE_ENV_PREFIX, key.upper()))
+        self.vaccine_type = config['vaccine_type']
+        self.top_left_longitude = config['top_left_longitude']
+        self.top_left_latitude = config['top_left_latitude']
+        self.bottom_right_longitude = config['bottom_right_longitude']
+        self.bottom_right_latitude = config['bottom_right_latitude']
+        self.__load_tuning(config)
+        return True
+
     def load_config(self):
         if debug_config:
             self.vaccine_type = "VEN00013"
@@ -351,8 +861,9 @@ class config_vaccine_reservation:
                 pre_top_left_latitude = config['top_left_latitude']
                 pre_bottom_right_longitude = config['bottom_right_longitude']
                 pre_bottom_right_latitude = config['bottom_right_latitude']
+                self.__load_tuning(config)
 
-            except configparser.Error as error:
+            except (configparser.Error, ValueError) as error:
                 logging.warning(error)
                 print("설정파일을 읽는동안 에러가 발생하였습니다.")
                 print("설정을 다시 입력해주세요.")
@@ -382,26 +893,169 @@ class config_vaccine_reservation:
         self.__set_config()
 
 
+async def run(config):
+    # 조회, 예약, 사용자 정보 요청이 하나의 커넥션 풀을 공유합니다.
+    async with kakao_http_client(metrics=hot_path_metrics()) as http_client:
+        print("사용자 정보를 불러오고 있습니다.")
+        user_info = kakao_user_info(http_client)
+        await user_info.load()
+
+        if user_info.get_user_status() is None:
+            logging.info("사용자 정보가 올바르지 않습니다.")
+            print("사용자 정보가 올바르지 않습니다.")
+            return
+        elif user_info.get_user_status() == "ALREADY_RESERVED":
+            logging.info("이미 접종이 완료되었거나 예약이 완료된 사용자입니다.")
+            print("이미 접종이 완료되었거나 예약이 완료된 사용자입니다.")
+            return
+
+        start_traffic_recorder(http_client, config)
+        try:
+            vacc_reserve = vaccine_reservation(user_info, http_client, config)
+            await vacc_reserve.find_vaccine()
+        except reservation_stopped as stopped:
+            report_reservation_stopped(stopped)
+        finally:
+            stop_traffic_recorder(http_client)
+
+
+def report_reservation_stopped(stopped):
+    # 조회 중 예약 응답으로 이미 예약된 사용자임을 확인한 경우
+    logging.info("reservation stopped : %s", stopped)
+    print("이미 접종이 완료되었거나 예약이 완료된 사용자입니다.")
+
+
+def start_traffic_recorder(http_client, config):
+    if config.record_traffic_file:
+        # 조회, 예약 응답을 기록해 두었다가 benchmarks/replay_recording.py 로 네트워크 없이 재생합니다.
+        http_client.recorder = traffic_recorder(config.record_traffic_file, config)
+        http_client.recorder.start()
+
+
+def stop_traffic_recorder(http_client):
+    # 남은 기록을 파일에 쓰고 닫습니다.
+    if http_client.recorder is not None:
+        http_client.recorder.stop()
+        http_client.recorder = None
+
+
+def parse_deadline(value):
+    """ 초 단위 실행 시간(예: 3600) 또는 ISO 시각(예: 2021-08-01T18:00)을 종료 시각(time.time 기준)으로 바꿉니다. """
+    if not value:
+        return None
+    try:
+        return time.time() + float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def install_stop_handler(stop_event):
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(signal_number, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            # windows 이벤트 루프는 add_signal_handler 를 지원하지 않습니다.
+            signal.signal(signal_number, lambda *_: loop.call_soon_threadsafe(stop_event.set))
+
+
+async def run_service(config_path, deadline=None):
+    """ 입력 없이 예약에 성공하거나, 종료 시각이 되거나, SIGTERM/SIGINT 를 받을 때까지 조회합니다. 종료 코드를 반환합니다. """
+    config = config_vaccine_reservation()
+    try:
+        config.load_service_config(config_path)
+        deadline = parse_deadline(deadline)
+    except (configparser.Error, ValueError) as error:
+        logging.error("config error : %s", error)
+        print("설정을 읽지 못했습니다. %s" % error)
+        return EXIT_CONFIG
+
+    stop_event = asyncio.Event()
+    install_stop_handler(stop_event)
+
+    async with kakao_http_client(metrics=hot_path_metrics()) as http_client:
+        user_info = kakao_user_info(http_client)
+        if not await user_info.load():
+            return EXIT_USER
+        if user_info.get_user_status() == "ALREADY_RESERVED":
+            logging.info("이미 접종이 완료되었거나 예약이 완료된 사용자입니다.")
+            print("이미 접종이 완료되었거나 예약이 완료된 사용자입니다.")
+            return EXIT_RESERVED
+
+        vacc_reserve = vaccine_reservation(user_info, http_client, config)
+        checkpoint = service_checkpoint(config.checkpoint_file, config.checkpoint_interval)
+        if vacc_reserve.restore_checkpoint(checkpoint.load()):
+            logging.info("checkpoint restored : %s", config.checkpoint_file)
+        checkpoint.start(vacc_reserve.checkpoint_state)
+
+        start_traffic_recorder(http_client, config)
+        search_task = asyncio.ensure_future(vacc_reserve.find_vaccine())
+        stop_task = asyncio.ensure_future(stop_event.wait())
+        try:
+            timeout = None if deadline is None else max(0.0, deadline - time.time())
+            await asyncio.wait({search_task, stop_task}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if search_task.done():
+                try:
+                    reserved = search_task.result()
+                except reservation_stopped as stopped:
+                    report_reservation_stopped(stopped)
+                    return EXIT_RESERVED
+                logging.info("service finished : reserved %s", reserved.get('orgCode'))
+                return EXIT_RESERVED
+            # 진행중인 조회, 예약 요청을 취소하고 화면, 캐시, 기록 정리가 끝날 때까지 기다립니다.
+            search_task.cancel()
+            await asyncio.gather(search_task, return_exceptions=True)
+            if stop_event.is_set():
+                logging.info("service stopped by signal")
+                print("종료 요청을 받아 조회를 멈춥니다.")
+                return EXIT_STOPPED
+            logging.info("service deadline reached")
+            print("종료 시각이 되어 조회를 멈춥니다.")
+            return EXIT_DEADLINE
+        finally:
+            stop_task.cancel()
+            if not search_task.done():
+                search_task.cancel()
+                await asyncio.gather(search_task, return_exceptions=True)
+            await checkpoint.stop(vacc_reserve.checkpoint_state)
+            stop_traffic_recorder(http_client)
+
+
 def main():
-    print("사용자 정보를 불러오고 있습니다.")
-    user_info = kakao_user_info()
-    user_info.load()
-
-    if user_info.get_user_status() is None:
-        logging.info("사용자 정보가 올바르지 않습니다.")
-        print("사용자 정보가 올바르지 않습니다.")
-        return close()
-    elif user_info.get_user_status() == "ALREADY_RESERVED":
-        logging.info("이미 접종이 완료되었거나 예약이 완료된 사용자입니다.")
-        print("이미 접종이 완료되었거나 예약이 완료된 사용자입니다.")
-        return close()
-
-    vacc_reserve = vaccine_reservation(user_info)
-    asyncio.run(vacc_reserve.find_vaccine())
+    parser = argparse.ArgumentParser(description="카카오 잔여백신 예약")
+    parser.add_argument('--service', action='store_true',
+                        help="입력 없이 실행 (설정 파일 / VACCINE_RUN_* 환경변수, SIGTERM 으로 종료, 상태 저장 후 재시작 시 복원)")
+    parser.add_argument('--config', default='config.ini', help="서비스 모드 설정 파일")
+    parser.add_argument('--deadline', default=os.environ.get(SERVICE_ENV_PREFIX + 'DEADLINE'),
+                        help="서비스 모드 종료 시각. 실행 시간(초) 또는 ISO 시각 (예: 2021-08-01T18:00)")
+    args = parser.parse_args()
+
+    log_writer = start_logging(log_file)
+    if args.service:
+        try:
+            return asyncio.run(run_service(args.config, args.deadline))
+        except Exception as exception:
+            logging.exception("Exception error : %s", exception)
+            print("Exception : ", exception)
+            return EXIT_ERROR
+        finally:
+            log_writer.stop()
+
+    try:
+        # 설정 입력은 이벤트 루프를 시작하기 전에 메인 스레드에서 받습니다. (입력 중 Ctrl+C 로 바로 종료)
+        config = config_vaccine_reservation()
+        config.load_config()
+        asyncio.run(run(config))
+    except Exception as exception:
+        # 재시도로 복구할 수 없는 에러 (분류되지 않은 예외)
+        logging.exception("Exception error : %s", exception)
+        print("Exception : ", exception)
+    finally:
+        log_writer.stop()
 
     return close()
 
 
 # ===================================== run ===================================== #
 if __name__ == '__main__':
-    main()
+    sys.exit(main())